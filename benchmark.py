@@ -0,0 +1,214 @@
+# benchmark.py
+
+"""
+Benchmark pipeline preprocessing -> TF-IDF -> KNN dengan korpus komentar sintetis.
+
+Contoh:
+    python benchmark.py --sizes 500 2000 5000 --save-baseline baseline.json
+    python benchmark.py --sizes 500 2000 5000 --baseline baseline.json --tolerance 0.2
+
+Setiap tahap melaporkan throughput (dokumen/detik), memori puncak (tracemalloc) dan
+persentil latensi. Jika --baseline diberikan, hasil dibandingkan dan skrip keluar dengan
+kode 1 bila ada tahap yang lebih lambat dari toleransi.
+"""
+
+import argparse
+import json
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from preprocessing_utils import full_preprocess_text, full_preprocess_batch, warm_up, SLANG_WORDS, STOPWORDS_SET
+from classification_utils import TFIDFVectorizer, KNeighborsClassifier, run_kfold_cross_validation
+
+LABELS = ['positif', 'negatif', 'netral']
+
+# Kosakata topik per sentimen agar KNN punya sinyal yang bisa dipelajari
+TOPIC_WORDS = {
+    'positif': ['aman', 'sehat', 'bagus', 'bermanfaat', 'terima', 'kasih', 'semangat', 'lindungi', 'mantap', 'percaya'],
+    'negatif': ['bahaya', 'takut', 'bohong', 'efek', 'samping', 'mati', 'tolak', 'konspirasi', 'rugi', 'paksa'],
+    'netral': ['vaksin', 'covid', 'dosis', 'jadwal', 'puskesmas', 'daftar', 'info', 'kapan', 'lokasi', 'antri']
+}
+NOISE = ['https://youtu.be/abc123', '@admin', '#vaksin', '!!!', '??', '123', 'wkwkwk', 'mantaaappp', '😂']
+
+
+def generate_corpus(n_docs, seed=42):
+    """Korpus komentar sintetis bergaya YouTube: slang, stopwords, noise, dan kata topik per label."""
+    rnd = random.Random(seed)
+    slang = sorted(word for word in SLANG_WORDS if ' ' not in word.strip())
+    formal = sorted({word for value in SLANG_WORDS.values() for word in value.split()})
+    stopwords = sorted(STOPWORDS_SET)
+    texts, labels = [], []
+    for _ in range(n_docs):
+        label = rnd.choice(LABELS)
+        words = []
+        for _ in range(rnd.randint(3, 25)):
+            roll = rnd.random()
+            if roll < 0.30: words.append(rnd.choice(TOPIC_WORDS[label]))
+            elif roll < 0.50: words.append(rnd.choice(slang))
+            elif roll < 0.70: words.append(rnd.choice(stopwords))
+            elif roll < 0.95: words.append(rnd.choice(formal))
+            else: words.append(rnd.choice(NOISE))
+        text = ' '.join(words)
+        texts.append(text.capitalize() if rnd.random() < 0.5 else text.upper() if rnd.random() < 0.1 else text)
+        labels.append(label)
+    return texts, labels
+
+
+def _percentiles(latencies):
+    if not latencies: return {'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    ordered = sorted(latencies)
+    def pick(q): return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] * 1000
+    return {'p50_ms': pick(0.50), 'p95_ms': pick(0.95), 'p99_ms': pick(0.99)}
+
+
+def _peak_memory_mb(func):
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+    finally:
+        tracemalloc.stop()
+
+
+def _stage_result(n_docs, total_seconds, latencies, peak_mb):
+    result = {'n_docs': n_docs, 'seconds': total_seconds,
+              'docs_per_sec': n_docs / total_seconds if total_seconds > 0 else 0.0,
+              'peak_mem_mb': peak_mb}
+    result.update(_percentiles(latencies))
+    return result
+
+
+def run_benchmarks(size, repeat=3, measure_memory=True, seed=42, k_options=(7, 9, 11, 13, 15, 17)):
+    """Menjalankan semua tahap untuk satu ukuran korpus. Mengembalikan dict {tahap: metrik}."""
+    texts, labels = generate_corpus(size, seed)
+    results = {}
+    def memory(func): return _peak_memory_mb(func) if measure_memory else None
+
+    # 1. Preprocessing (latensi per dokumen). Stemmer Sastrawi dan matcher kamus dibuat lebih dulu
+    # di luar pengukuran (inisialisasi malas tidak ikut p99/max); cache stem lalu dikosongkan
+    # agar setiap ukuran mulai dingin.
+    from preprocessing_utils import cached_stem
+    warm_up()
+    full_preprocess_text(texts[0])
+    cached_stem.cache_clear()
+    latencies, stemmed = [], []
+    start = time.perf_counter()
+    for text in texts:
+        t0 = time.perf_counter()
+        stemmed.append(full_preprocess_text(text)['stemmed'])
+        latencies.append(time.perf_counter() - t0)
+    results['preprocess'] = _stage_result(size, time.perf_counter() - start, latencies,
+                                          memory(lambda: full_preprocess_batch(texts)))
+
+    split = int(size * 0.8)
+    X_train, X_test, y_train = stemmed[:split], stemmed[split:], labels[:split]
+
+    # 2. TF-IDF fit (latensi per pengulangan)
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        vectorizer = TFIDFVectorizer().fit(X_train)
+        latencies.append(time.perf_counter() - t0)
+    results['tfidf_fit'] = _stage_result(len(X_train) * repeat, sum(latencies), latencies,
+                                         memory(lambda: TFIDFVectorizer().fit(X_train)))
+
+    # 3. TF-IDF transform (latensi per dokumen)
+    latencies = []
+    start = time.perf_counter()
+    for doc in X_train:
+        t0 = time.perf_counter()
+        vectorizer.transform([doc], sparse=True)
+        latencies.append(time.perf_counter() - t0)
+    results['tfidf_transform'] = _stage_result(len(X_train), time.perf_counter() - start, latencies,
+                                               memory(lambda: vectorizer.transform(X_train, sparse=True)))
+    X_train_vec, X_test_vec = vectorizer.transform(X_train, sparse=True), vectorizer.transform(X_test, sparse=True)
+
+    # 4. KNN predict: throughput dari prediksi batch, latensi dari prediksi satu per satu
+    knn = KNeighborsClassifier(k=max(k_options)).fit(X_train_vec, y_train)
+    start = time.perf_counter()
+    knn.predict(X_test_vec)
+    batch_seconds = time.perf_counter() - start
+    latencies = []
+    for vec in X_test_vec[:200]:
+        t0 = time.perf_counter()
+        knn.predict([vec])
+        latencies.append(time.perf_counter() - t0)
+    results['knn_predict'] = _stage_result(len(X_test_vec), batch_seconds, latencies,
+                                           memory(lambda: knn.predict(X_test_vec)))
+
+    # 5. K-Fold cross validation lengkap (latensi per pengulangan)
+    latencies = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        run_kfold_cross_validation(stemmed, labels, list(k_options), n_folds=5, random_state=seed)
+        latencies.append(time.perf_counter() - t0)
+    results['kfold'] = _stage_result(size * repeat, sum(latencies), latencies,
+                                     memory(lambda: run_kfold_cross_validation(stemmed, labels, list(k_options), n_folds=5, random_state=seed)))
+    return results
+
+
+def compare_with_baseline(current, baseline, tolerance):
+    """Daftar regresi: throughput turun atau p95 naik lebih dari toleransi (rasio)."""
+    regressions = []
+    for size, stages in current['results'].items():
+        for stage, metrics in stages.items():
+            base = baseline.get('results', {}).get(size, {}).get(stage)
+            if not base: continue
+            if base['docs_per_sec'] and metrics['docs_per_sec'] < base['docs_per_sec'] * (1 - tolerance):
+                regressions.append(f"[{size}] {stage}: throughput {metrics['docs_per_sec']:.1f} < baseline {base['docs_per_sec']:.1f} dok/dtk")
+            if base['p95_ms'] and metrics['p95_ms'] > base['p95_ms'] * (1 + tolerance):
+                regressions.append(f"[{size}] {stage}: p95 {metrics['p95_ms']:.3f} ms > baseline {base['p95_ms']:.3f} ms")
+    return regressions
+
+
+def print_report(report):
+    header = f"{'ukuran':>7} {'tahap':<16} {'dok/dtk':>11} {'mem MB':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    print(header)
+    print('-' * len(header))
+    for size, stages in report['results'].items():
+        for stage, m in stages.items():
+            mem = f"{m['peak_mem_mb']:.1f}" if m['peak_mem_mb'] is not None else '-'
+            print(f"{size:>7} {stage:<16} {m['docs_per_sec']:>11.1f} {mem:>8} {m['p50_ms']:>9.3f} {m['p95_ms']:>9.3f} {m['p99_ms']:>9.3f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark pipeline preprocessing -> TF-IDF -> KNN.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[500, 2000, 5000], help='Jumlah dokumen sintetis per skenario.')
+    parser.add_argument('--repeat', type=int, default=3, help='Pengulangan untuk tahap fit dan k-fold.')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--no-memory', action='store_true', help='Lewati pengukuran memori puncak (lebih cepat).')
+    parser.add_argument('--output', help='Simpan hasil lengkap ke file JSON.')
+    parser.add_argument('--save-baseline', help='Simpan hasil sebagai baseline JSON.')
+    parser.add_argument('--baseline', help='Bandingkan dengan baseline JSON yang tersimpan.')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='Toleransi regresi (0.2 = 20%%).')
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(), 'seed': args.seed,
+                 'repeat': args.repeat, 'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S')},
+        'results': {str(size): run_benchmarks(size, args.repeat, not args.no_memory, args.seed) for size in args.sizes}
+    }
+    print_report(report)
+
+    for path in filter(None, [args.output, args.save_baseline]):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan ke {path}")
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare_with_baseline(report, baseline, args.tolerance)
+        if regressions:
+            print(f"\nREGRESI terdeteksi (toleransi {args.tolerance:.0%}):")
+            for line in regressions: print(f"  - {line}")
+            return 1
+        print(f"\nTidak ada regresi dibanding baseline (toleransi {args.tolerance:.0%}).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
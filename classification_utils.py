@@ -1,60 +1,399 @@
 # classification_utils.py
 
 import math
+import heapq
 from collections import Counter
 import random
 import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+try:
+    # Opsional: engine KNN berbasis perkalian matriks sparse
+    import numpy as np
+    from scipy import sparse as sp
+except ImportError:
+    np, sp = None, None
 
 class TFIDFVectorizer:
+    """
+    TF-IDF manual. Mendukung penambahan/penghapusan dokumen secara inkremental
+    (partial_fit / remove_documents): document frequency (df_) selalu diperbarui,
+    sedangkan IDF baru dihitung ulang saat idf_ dibaca berikutnya.
+    Indeks term di vocabulary_ tidak pernah berubah setelah ditetapkan.
+    """
     def __init__(self):
-        self.vocabulary_, self.idf_, self.doc_count_ = {}, {}, 0
+        self.vocabulary_, self.df_, self.doc_count_ = {}, Counter(), 0
+        self._idf, self._idf_dirty = {}, False
+    @property
+    def idf_(self):
+        if self._idf_dirty:
+            self._idf = {term: math.log((self.doc_count_ + 1) / (count + 1)) + 1 for term, count in self.df_.items()}
+            self._idf_dirty = False
+        return self._idf
     def _calculate_tf(self, c, t):
         return c / t if t > 0 else 0
     def fit(self, docs):
-        self.doc_count_, term_doc_counts, vocab_idx = len(docs), Counter(), 0
+        self.vocabulary_, self.df_, self.doc_count_ = {}, Counter(), 0
+        return self.partial_fit(docs)
+    def partial_fit(self, docs):
+        """Menambahkan dokumen baru ke statistik TF-IDF tanpa melatih ulang dari awal."""
+        for doc in docs:
+            terms = doc.split()
+            for term in terms:
+                if term not in self.vocabulary_: self.vocabulary_[term] = len(self.vocabulary_)
+            self.df_.update(set(terms))
+            self.doc_count_ += 1
+        self._idf_dirty = True
+        return self
+    def remove_documents(self, docs):
+        """Mengeluarkan dokumen yang sebelumnya dimasukkan lewat fit/partial_fit."""
         for doc in docs:
-            seen = set()
-            for term in doc.split():
-                if term not in self.vocabulary_: self.vocabulary_[term], vocab_idx = vocab_idx, vocab_idx + 1
-                if term not in seen:
-                    term_doc_counts[term] += 1
-                    seen.add(term)
-        for term, count in term_doc_counts.items():
-            self.idf_[term] = math.log((self.doc_count_ + 1) / (count + 1)) + 1
+            for term in set(doc.split()):
+                self.df_[term] -= 1
+                if self.df_[term] <= 0: del self.df_[term]
+            self.doc_count_ -= 1
+        self._idf_dirty = True
         return self
-    def transform(self, docs):
+    def transform(self, docs, sparse=False):
+        """
+        Mengubah dokumen menjadi vektor TF-IDF.
+        Jika sparse=True, setiap vektor berupa dict {indeks_term: bobot} yang sudah
+        dinormalisasi L2, sehingga cosine similarity cukup dihitung sebagai dot product.
+        """
+        idf = self.idf_
+        if sparse: return [self._transform_sparse(doc, idf) for doc in docs]
         vectors = []
         for doc in docs:
             vec, terms, term_counts = [0.0] * len(self.vocabulary_), doc.split(), Counter(doc.split())
             for term, count in term_counts.items():
                 if term in self.vocabulary_:
                     tf = self._calculate_tf(count, len(terms))
-                    vec[self.vocabulary_[term]] = tf * self.idf_.get(term, 0)
+                    vec[self.vocabulary_[term]] = tf * idf.get(term, 0)
             vectors.append(vec)
         return vectors
+    def _transform_sparse(self, doc, idf):
+        terms = doc.split()
+        vec = {}
+        for term, count in Counter(terms).items():
+            if term in self.vocabulary_:
+                weight = self._calculate_tf(count, len(terms)) * idf.get(term, 0)
+                if weight: vec[self.vocabulary_[term]] = weight
+        return normalize_sparse_vector(vec)
+
+def knn_options_from_config(config):
+    """Parameter KNeighborsClassifier (engine, ukuran blok, parameter LSH) dari konfigurasi aplikasi."""
+    return {
+        'algorithm': config.get('KNN_ALGORITHM', 'auto'),
+        'block_size': config.get('KNN_BLOCK_SIZE', 1024),
+        'lsh_tables': config.get('KNN_LSH_TABLES', 16),
+        'lsh_bits': config.get('KNN_LSH_BITS', 8)
+    }
+
+def normalize_sparse_vector(vec):
+    """Normalisasi L2 untuk vektor sparse (dict). Vektor nol dikembalikan sebagai dict kosong."""
+    norm = math.sqrt(sum(v * v for v in vec.values()))
+    if norm == 0: return {}
+    return {i: v / norm for i, v in vec.items()}
+
+def to_sparse_vector(vec):
+    """Mengubah vektor dense (list) atau sparse (dict) menjadi vektor sparse ternormalisasi."""
+    if isinstance(vec, dict): return normalize_sparse_vector(vec)
+    return normalize_sparse_vector({i: v for i, v in enumerate(vec) if v})
 
 class KNeighborsClassifier:
-    def __init__(self, k=3):
-        self.k, self.X_train_, self.y_train_, self.X_train_norms_ = k, None, None, None
+    """
+    KNN dengan jarak cosine dan voting berbobot (1 / jarak).
+    Menerima vektor dense (list) maupun sparse (dict dari TFIDFVectorizer.transform(..., sparse=True)).
+    Secara internal semua vektor disimpan sebagai dict sparse yang sudah dinormalisasi L2.
+
+    algorithm:
+      - 'brute'  : loop Python per dokumen uji.
+      - 'matrix' : blok similarity uji x latih dihitung sebagai perkalian matriks sparse (SciPy),
+                   top-k dipilih dengan partial selection (np.partition), bukan sort penuh.
+                   Data uji dan data latih diproses per blok berukuran block_size; yang disimpan
+                   hanya k kandidat terbaik sementara per dokumen uji, sehingga memori puncak
+                   sebanding dengan block_size x (block_size + k), bukan jumlah data uji x data latih.
+      - 'inverted': skor hanya diakumulasikan lewat inverted index (indeks term -> posting list),
+                   jadi hanya dokumen latih yang berbagi minimal satu term dengan dokumen uji yang dihitung.
+      - 'lsh'    : approximate nearest neighbor dengan random-hyperplane LSH (NumPy). Hanya kandidat
+                   yang jatuh di bucket yang sama yang dihitung jaraknya. lsh_tables menaikkan recall,
+                   lsh_bits menaikkan kecepatan (bucket makin kecil). Hasilnya bisa berbeda dari engine exact.
+      - 'auto'   : 'inverted' (exact). Untuk komentar pendek (sedikit term per dokumen) engine ini paling
+                   cepat dan memorinya hanya sebanding dengan jumlah kandidat per dokumen uji.
+    block_size hanya berpengaruh pada 'matrix'; engine lain memproses dokumen uji satu per satu.
+    Urutan tetangga selalu (jarak, indeks data latih), sama seperti sort stabil pada versi lama,
+    sehingga hasil voting identik untuk semua engine.
+
+    n_jobs > 1 membagi dokumen uji menjadi beberapa potongan yang diproses di process pool.
+    partial_fit / remove_rows menambah atau menghapus baris data latih tanpa fit ulang;
+    struktur index (matriks/inverted index) diperbarui atau dibangun ulang saat dibutuhkan.
+    """
+    def __init__(self, k=3, algorithm='auto', block_size=1024, n_jobs=1, lsh_tables=16, lsh_bits=8, random_state=0):
+        self.k, self.algorithm, self.block_size, self.n_jobs = k, algorithm, block_size, n_jobs
+        self.lsh_tables, self.lsh_bits, self.random_state = lsh_tables, lsh_bits, random_state
+        self.X_train_, self.y_train_, self.algorithm_ = None, None, None
+        self._train_matrix, self._inverted_index, self._lsh_index = None, None, None
     def fit(self, X_train, y_train):
-        self.X_train_, self.y_train_ = X_train, y_train
-        self.X_train_norms_ = [math.sqrt(sum(v**2 for v in vec)) for vec in self.X_train_]
+        self.X_train_, self.y_train_ = [to_sparse_vector(vec) for vec in X_train], list(y_train)
+        self.algorithm_ = self._resolve_algorithm()
+        self._train_matrix, self._inverted_index, self._lsh_index = None, None, None
+        self._ensure_index()
+        return self
+    def partial_fit(self, X_new, y_new):
+        """Menambahkan baris data latih baru di akhir (indeks baris lama tidak berubah)."""
+        start, new_rows = len(self.X_train_), [to_sparse_vector(vec) for vec in X_new]
+        self.X_train_.extend(new_rows)
+        self.y_train_.extend(y_new)
+        if self._inverted_index is not None: self._inverted_index.add(start, new_rows)
+        if self._lsh_index is not None: self._lsh_index.add(start, new_rows)
+        self._train_matrix = None
         return self
-    def _cosine_distance(self, n1, v1, n2, v2):
-        if n1 == 0 or n2 == 0: return 1.0
-        return 1.0 - (sum(a * b for a, b in zip(v1, v2)) / (n1 * n2))
-    def _predict_single(self, x_test):
-        norm_x = math.sqrt(sum(v**2 for v in x_test))
-        dists = [(self._cosine_distance(norm_x, x_test, self.X_train_norms_[i], xt), self.y_train_[i]) for i, xt in enumerate(self.X_train_)]
-        dists.sort(key=lambda item: item[0])
-        neighbors = dists[:self.k]
+    def remove_rows(self, indices):
+        """Menghapus baris data latih; baris sesudahnya bergeser ke indeks yang lebih kecil."""
+        drop = set(indices)
+        keep = [i for i in range(len(self.X_train_)) if i not in drop]
+        self.X_train_, self.y_train_ = [self.X_train_[i] for i in keep], [self.y_train_[i] for i in keep]
+        self._train_matrix, self._inverted_index, self._lsh_index = None, None, None
+        return self
+    def _ensure_index(self):
+        if self.algorithm_ == 'matrix' and self._train_matrix is None:
+            self._train_matrix = _to_csr_matrix(self.X_train_)
+        elif self.algorithm_ == 'inverted' and self._inverted_index is None:
+            self._inverted_index = InvertedIndex().fit(self.X_train_)
+        elif self.algorithm_ == 'lsh' and self._lsh_index is None:
+            self._lsh_index = CosineLSHIndex(self.lsh_tables, self.lsh_bits, self.random_state).fit(self.X_train_)
+    def _resolve_algorithm(self):
+        if self.algorithm == 'auto': return 'inverted'
+        if self.algorithm == 'matrix' and sp is None:
+            raise ImportError("algorithm='matrix' membutuhkan paket numpy dan scipy.")
+        if self.algorithm == 'lsh' and np is None:
+            raise ImportError("algorithm='lsh' membutuhkan paket numpy.")
+        if self.algorithm not in ('brute', 'matrix', 'inverted', 'lsh'):
+            raise ValueError(f"Algoritma KNN tidak dikenal: {self.algorithm}")
+        return self.algorithm
+    def _cosine_distance(self, v1, v2):
+        if not v1 or not v2: return 1.0
+        if len(v1) > len(v2): v1, v2 = v2, v1
+        return 1.0 - sum(w * v2[i] for i, w in v1.items() if i in v2)
+    def _kneighbors_brute(self, X_test, n_neighbors):
+        results = []
+        for x_test in X_test:
+            dists = ((self._cosine_distance(x_test, xt), i) for i, xt in enumerate(self.X_train_))
+            results.append(heapq.nsmallest(n_neighbors, dists))
+        return results
+    def _kneighbors_matrix(self, X_test, n_neighbors):
+        results, (n_train, n_features) = [], self._train_matrix.shape
+        train_blocks = [(start, self._train_matrix[start:start + self.block_size].T.tocsc())
+                        for start in range(0, n_train, self.block_size)]
+        for start in range(0, len(X_test), self.block_size):
+            batch = _to_csr_matrix(X_test[start:start + self.block_size], n_features)
+            best_dists = np.empty((batch.shape[0], 0))
+            best_idx = np.empty((batch.shape[0], 0), dtype=np.int64)
+            for block_start, block in train_blocks:
+                dists = 1.0 - (batch @ block).toarray()
+                block_idx = np.broadcast_to(np.arange(block_start, block_start + dists.shape[1]), dists.shape)
+                # Kandidat lama (indeksnya selalu lebih kecil) ditaruh di depan agar urutan posisi = urutan indeks
+                dists, idx = np.hstack((best_dists, dists)), np.hstack((best_idx, block_idx))
+                keep = _select_top_k_rows(dists, n_neighbors)
+                best_dists, best_idx = np.take_along_axis(dists, keep, axis=1), np.take_along_axis(idx, keep, axis=1)
+            for row_dists, row_idx in zip(best_dists.tolist(), best_idx.tolist()):
+                results.append(list(zip(row_dists, row_idx)))
+        return results
+    def _kneighbors_inverted(self, X_test, n_neighbors):
+        results = []
+        for x_test in X_test:
+            scores = self._inverted_index.scores(x_test)
+            neighbors = heapq.nsmallest(n_neighbors, ((1.0 - score, i) for i, score in scores.items()))
+            # Kandidat kurang dari k: sisanya diisi dokumen tanpa term bersama (jarak 1.0)
+            # dengan urutan indeks, persis seperti hasil brute force.
+            results.append(self._pad_neighbors(neighbors, scores, n_neighbors))
+        return results
+    def _kneighbors_lsh(self, X_test, n_neighbors):
+        results = []
+        train_matrix = self._lsh_train_matrix()
+        for x_test, candidates in zip(X_test, self._lsh_index.candidates_batch(X_test)):
+            if train_matrix is not None and candidates:
+                # Jarak kandidat dihitung sekaligus lewat baris-baris matriks latih
+                rows = np.sort(np.fromiter(candidates, dtype=np.int64, count=len(candidates)))
+                query = np.zeros(train_matrix.shape[1])
+                for i, w in x_test.items():
+                    if i < len(query): query[i] = w
+                dists = 1.0 - train_matrix[rows] @ query
+                neighbors = [(float(dists[j]), int(rows[j])) for j in _select_top_k(dists, n_neighbors)]
+            else:
+                dists = ((self._cosine_distance(x_test, self.X_train_[i]), i) for i in candidates)
+                neighbors = heapq.nsmallest(n_neighbors, dists)
+            # Baris di luar bucket dianggap tidak mirip (jarak 1.0); inilah sumber galat aproksimasi.
+            results.append(self._pad_neighbors(neighbors, candidates, n_neighbors))
+        return results
+    def _lsh_train_matrix(self):
+        if sp is None: return None
+        if self._train_matrix is None: self._train_matrix = _to_csr_matrix(self.X_train_)
+        return self._train_matrix
+    def _pad_neighbors(self, neighbors, seen, n_neighbors):
+        for i in range(len(self.X_train_)):
+            if len(neighbors) >= n_neighbors: break
+            if i not in seen: neighbors.append((1.0, i))
+        return neighbors
+    def kneighbors(self, X_test, n_neighbors=None):
+        """
+        Mengembalikan daftar tetangga terdekat untuk setiap dokumen uji,
+        masing-masing berupa list (jarak, indeks_data_latih) terurut naik.
+        """
+        n_neighbors = min(n_neighbors or self.k, len(self.X_train_))
+        X_test = [to_sparse_vector(x) for x in X_test]
+        if n_neighbors <= 0: return [[] for _ in X_test]
+        self._ensure_index()
+        if self.n_jobs > 1 and len(X_test) > 1:
+            size = math.ceil(len(X_test) / self.n_jobs)
+            chunks = [X_test[i:i + size] for i in range(0, len(X_test), size)]
+            with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+                parts = executor.map(self._kneighbors_chunk, chunks, repeat(n_neighbors))
+                return [neighbors for part in parts for neighbors in part]
+        return self._kneighbors_chunk(X_test, n_neighbors)
+    def _kneighbors_chunk(self, X_test, n_neighbors):
+        if self.algorithm_ == 'matrix': return self._kneighbors_matrix(X_test, n_neighbors)
+        if self.algorithm_ == 'inverted': return self._kneighbors_inverted(X_test, n_neighbors)
+        if self.algorithm_ == 'lsh': return self._kneighbors_lsh(X_test, n_neighbors)
+        return self._kneighbors_brute(X_test, n_neighbors)
+    def _vote(self, neighbors):
         if not neighbors: return None
         weights = {}
-        for dist, label in neighbors:
+        for dist, i in neighbors:
+            label = self.y_train_[i]
             weights[label] = weights.get(label, 0) + (1 / (dist + 1e-6))
         return max(weights, key=weights.get)
-    def predict(self, X_test):
-        return [self._predict_single(x) for x in X_test]
+    def predict_from_neighbors(self, neighbors_list, k=None):
+        """Voting dari hasil kneighbors(); k lebih kecil memakai prefix dari setiap daftar tetangga."""
+        k = k or self.k
+        return [self._vote(neighbors[:k]) for neighbors in neighbors_list]
+    def predict(self, X_test, k=None):
+        k = k or self.k
+        return self.predict_from_neighbors(self.kneighbors(X_test, n_neighbors=k), k)
+
+class InvertedIndex:
+    """
+    Inverted index untuk vektor sparse ternormalisasi: indeks term (nilai dari
+    TFIDFVectorizer.vocabulary_) -> posting list berisi (baris data latih, bobot).
+    """
+    def __init__(self):
+        self.postings_ = {}
+    def fit(self, vectors):
+        self.postings_ = {}
+        return self.add(0, vectors)
+    def add(self, start, vectors):
+        """Menambahkan vektor sebagai baris start, start+1, ..."""
+        for row, vec in enumerate(vectors, start):
+            for i, w in vec.items():
+                self.postings_.setdefault(i, []).append((row, w))
+        return self
+    def scores(self, vec):
+        """Cosine similarity terhadap setiap baris yang berbagi minimal satu term dengan vec."""
+        scores = {}
+        for i, w in vec.items():
+            for row, w_row in self.postings_.get(i, ()):
+                scores[row] = scores.get(row, 0.0) + w * w_row
+        return scores
+
+class CosineLSHIndex:
+    """
+    Random-hyperplane LSH untuk cosine similarity. Setiap tabel memakai n_bits hyperplane acak;
+    tanda proyeksi vektor pada hyperplane membentuk kunci bucket. Dua vektor dengan sudut kecil
+    berpeluang besar mendapat kunci yang sama di minimal satu tabel.
+    """
+    def __init__(self, n_tables=16, n_bits=8, random_state=0):
+        self.n_tables, self.n_bits, self.random_state = n_tables, n_bits, random_state
+        self._rng, self.planes_, self.buckets_ = None, None, []
+        self._powers = None
+    def fit(self, vectors):
+        self._rng = np.random.RandomState(self.random_state)
+        self.planes_ = np.zeros((self.n_tables * self.n_bits, 0), dtype=np.float32)
+        self.buckets_ = [{} for _ in range(self.n_tables)]
+        self._powers = (1 << np.arange(self.n_bits, dtype=np.int64))
+        return self.add(0, vectors)
+    def _ensure_features(self, n_features):
+        current = self.planes_.shape[1]
+        if n_features <= current: return
+        # Tumbuh berlipat agar penambahan vocabulary baru tidak memicu realokasi setiap kali
+        extra = max(n_features, 2 * current) - current
+        new_planes = self._rng.standard_normal((self.planes_.shape[0], extra)).astype(np.float32)
+        self.planes_ = np.hstack((self.planes_, new_planes))
+    def _keys(self, vectors):
+        n_features = max((max(vec) + 1 for vec in vectors if vec), default=0)
+        self._ensure_features(n_features)
+        if sp is not None:
+            projections = np.asarray(_to_csr_matrix(vectors, self.planes_.shape[1]) @ self.planes_.T)
+        else:
+            projections = np.zeros((len(vectors), self.planes_.shape[0]), dtype=np.float32)
+            for row, vec in enumerate(vectors):
+                if vec:
+                    idx, w = np.fromiter(vec.keys(), dtype=np.int64), np.fromiter(vec.values(), dtype=np.float32)
+                    projections[row] = self.planes_[:, idx] @ w
+        bits = (projections >= 0).reshape(len(vectors), self.n_tables, self.n_bits)
+        return bits.astype(np.int64) @ self._powers
+    def add(self, start, vectors):
+        if not vectors: return self
+        for row, keys in enumerate(self._keys(vectors), start):
+            for table, key in zip(self.buckets_, keys.tolist()):
+                table.setdefault(key, []).append(row)
+        return self
+    def candidates_batch(self, vectors):
+        """Untuk setiap vektor: himpunan baris yang berbagi bucket dengannya di minimal satu tabel."""
+        results = []
+        for keys in (self._keys(vectors).tolist() if vectors else []):
+            found = set()
+            for table, key in zip(self.buckets_, keys):
+                found.update(table.get(key, ()))
+            results.append(found)
+        return results
+
+def _to_csr_matrix(vectors, n_features=None):
+    """Menyusun list vektor sparse (dict) menjadi scipy.sparse.csr_matrix."""
+    indptr, indices, data = [0], [], []
+    for vec in vectors:
+        for i, w in vec.items():
+            if n_features is None or i < n_features:
+                indices.append(i)
+                data.append(w)
+        indptr.append(len(indices))
+    if n_features is None: n_features = max(indices) + 1 if indices else 1
+    return sp.csr_matrix((np.asarray(data, dtype=np.float64), np.asarray(indices, dtype=np.int64), np.asarray(indptr, dtype=np.int64)), shape=(len(vectors), n_features))
+
+def _select_top_k_rows(dists, k):
+    """
+    Versi per-baris dari _select_top_k untuk matriks jarak 2D: mengembalikan posisi k jarak
+    terkecil di setiap baris, terurut naik. Jarak yang sama diputus berdasarkan posisi kolom.
+    """
+    if k >= dists.shape[1]:
+        return np.argsort(dists, axis=1, kind='stable')
+    threshold = np.partition(dists, k - 1, axis=1)[:, k - 1:k]
+    selected = dists <= threshold
+    excess = np.flatnonzero(selected.sum(axis=1) > k)
+    if len(excess):
+        # Hanya baris dengan jarak kembar di batas ke-k yang perlu dipangkas berdasarkan posisi
+        sub, sub_threshold = dists[excess], threshold[excess]
+        ties = sub == sub_threshold
+        needed = k - (sub < sub_threshold).sum(axis=1, keepdims=True)
+        selected[excess] = (sub < sub_threshold) | (ties & (np.cumsum(ties, axis=1) <= needed))
+    positions = np.nonzero(selected)[1].reshape(dists.shape[0], k)
+    order = np.argsort(np.take_along_axis(dists, positions, axis=1), axis=1, kind='stable')
+    return np.take_along_axis(positions, order, axis=1)
+
+def _select_top_k(dists, k):
+    """
+    Memilih indeks k jarak terkecil dengan partial selection (O(n)), lalu mengurutkannya.
+    Jarak yang sama di batas ke-k diputus berdasarkan indeks terkecil agar identik dengan sort stabil.
+    """
+    if k >= len(dists):
+        selected = np.arange(len(dists))
+    else:
+        threshold = np.partition(dists, k - 1)[k - 1]
+        below = np.flatnonzero(dists < threshold)
+        ties = np.flatnonzero(dists == threshold)[:k - len(below)]
+        selected = np.concatenate((below, ties))
+    return selected[np.lexsort((selected, dists[selected]))]
 
 def train_test_split(X, y, test_size=0.2, random_state=None):
     combined = list(zip(X, y))
@@ -86,11 +425,73 @@ def calculate_metrics(y_true, y_pred, labels=['positif', 'negatif', 'netral']):
         rep[l] = {'precision': prec, 'recall': rec, 'f1_score': f1, 'support': tp + fn}
     return {'confusion_matrix': matrix, 'accuracy': acc, 'report': rep, 'labels': labels}
 
+def ann_agreement_report(X, y, k=7, test_size=0.2, random_state=42, lsh_tables=16, lsh_bits=8):
+    """
+    Membandingkan engine LSH dengan engine exact pada satu split validasi.
+    agreement: proporsi dokumen uji yang prediksinya sama; recall: rata-rata proporsi tetangga
+    exact (yang berbagi term, jarak < 1) yang juga ditemukan LSH.
+    """
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=random_state)
+    vectorizer = TFIDFVectorizer().fit(X_train)
+    X_train_vec, X_test_vec = vectorizer.transform(X_train, sparse=True), vectorizer.transform(X_test, sparse=True)
+
+    exact = KNeighborsClassifier(k=k).fit(X_train_vec, y_train)
+    ann = KNeighborsClassifier(k=k, algorithm='lsh', lsh_tables=lsh_tables, lsh_bits=lsh_bits, random_state=random_state).fit(X_train_vec, y_train)
+    start = time.perf_counter()
+    exact_neighbors = exact.kneighbors(X_test_vec)
+    exact_seconds, start = time.perf_counter() - start, time.perf_counter()
+    ann_neighbors = ann.kneighbors(X_test_vec)
+    ann_seconds = time.perf_counter() - start
+
+    exact_pred, ann_pred = exact.predict_from_neighbors(exact_neighbors), ann.predict_from_neighbors(ann_neighbors)
+    recalls = []
+    for e_nb, a_nb in zip(exact_neighbors, ann_neighbors):
+        relevant = {i for dist, i in e_nb if dist < 1.0}
+        if relevant: recalls.append(len(relevant & {i for _, i in a_nb}) / len(relevant))
+    n_test = len(y_test)
+    return {
+        'k': k, 'lsh_tables': lsh_tables, 'lsh_bits': lsh_bits, 'n_train': len(y_train), 'n_test': n_test,
+        'agreement': sum(1 for e, a in zip(exact_pred, ann_pred) if e == a) / n_test if n_test else 0,
+        'recall': statistics.mean(recalls) if recalls else 1.0,
+        'exact_accuracy': sum(1 for t, p in zip(y_test, exact_pred) if t == p) / n_test if n_test else 0,
+        'ann_accuracy': sum(1 for t, p in zip(y_test, ann_pred) if t == p) / n_test if n_test else 0,
+        'exact_seconds': exact_seconds, 'ann_seconds': ann_seconds
+    }
+
+def _evaluate_fold(train_data, test_data, k_options, prediction_jobs=1, knn_options=None):
+    """
+    Melatih dan menguji satu fold untuk semua nilai K sekaligus.
+    Tetangga terdekat (sebanyak max(K)) dihitung sekali; prediksi setiap K diambil dari prefix-nya.
+    """
+    X_train_fold, y_train_fold = [d[0] for d in train_data], [d[1] for d in train_data]
+    X_test_fold, y_test_fold = [d[0] for d in test_data], [d[1] for d in test_data]
+    if not X_train_fold or not X_test_fold: return None
+
+    vectorizer = TFIDFVectorizer().fit(X_train_fold)
+    X_train_tfidf, X_test_tfidf = vectorizer.transform(X_train_fold, sparse=True), vectorizer.transform(X_test_fold, sparse=True)
+
+    max_k = max(k_options)
+    knn = KNeighborsClassifier(k=max_k, n_jobs=prediction_jobs, **(knn_options or {})).fit(X_train_tfidf, y_train_fold)
+    neighbors = knn.kneighbors(X_test_tfidf, n_neighbors=max_k)
+
+    accuracies = {}
+    for k in k_options:
+        y_pred = knn.predict_from_neighbors(neighbors, k)
+        accuracies[k] = sum(1 for t, p in zip(y_test_fold, y_pred) if t == p) / len(y_test_fold)
+    return accuracies
+
 # ==============================================================================
 # REVISI FINAL FUNGSI K-FOLD UNTUK HASIL YANG 100% KONSISTEN
 # ==============================================================================
-def run_kfold_cross_validation(X, y, k_options, n_folds=5, random_state=None):
-    """Menjalankan Stratified K-Fold CV yang bisa direproduksi secara konsisten."""
+def run_kfold_cross_validation(X, y, k_options, n_folds=5, random_state=None, n_jobs=1, prediction_jobs=1, knn_options=None, progress=None):
+    """
+    Menjalankan Stratified K-Fold CV yang bisa direproduksi secara konsisten.
+    n_jobs > 1 menjalankan fold secara paralel di process pool; prediction_jobs > 1 membagi
+    prediksi di dalam setiap fold menjadi potongan paralel. Pembagian fold selalu dilakukan
+    di proses utama, sehingga hasilnya identik dengan eksekusi serial untuk random_state yang sama.
+    knn_options diteruskan ke KNeighborsClassifier (mis. engine 'lsh' dan parameternya).
+    progress(fold_selesai, n_folds) dipanggil setiap kali satu fold selesai (opsional).
+    """
     data_by_label = {label: [] for label in set(y)}
     for i, label in enumerate(y):
         data_by_label[label].append((X[i], y[i]))
@@ -117,23 +518,25 @@ def run_kfold_cross_validation(X, y, k_options, n_folds=5, random_state=None):
 
     k_accuracies = {k: [] for k in k_options}
     
+    fold_tasks = []
     for i in range(n_folds):
         train_data = [item for idx, fold in enumerate(folds) if idx != i for item in fold]
-        test_data = folds[i]
-
-        X_train_fold, y_train_fold = [d[0] for d in train_data], [d[1] for d in train_data]
-        X_test_fold, y_test_fold = [d[0] for d in test_data], [d[1] for d in test_data]
-
-        if not X_train_fold or not X_test_fold: continue
-        
-        vectorizer = TFIDFVectorizer().fit(X_train_fold)
-        X_train_tfidf, X_test_tfidf = vectorizer.transform(X_train_fold), vectorizer.transform(X_test_fold)
-        
-        for k in k_options:
-            knn = KNeighborsClassifier(k=k).fit(X_train_tfidf, y_train_fold)
-            y_pred = knn.predict(X_test_tfidf)
-            
-            accuracy = sum(1 for t, p in zip(y_test_fold, y_pred) if t == p) / len(y_test_fold) if y_test_fold else 0
+        fold_tasks.append((train_data, folds[i]))
+
+    fold_results = []
+    if n_jobs > 1 and len(fold_tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(fold_tasks))) as executor:
+            for result in executor.map(_evaluate_fold, *zip(*fold_tasks), repeat(k_options), repeat(prediction_jobs), repeat(knn_options)):
+                fold_results.append(result)
+                if progress: progress(len(fold_results), len(fold_tasks))
+    else:
+        for train_data, test_data in fold_tasks:
+            fold_results.append(_evaluate_fold(train_data, test_data, k_options, prediction_jobs, knn_options))
+            if progress: progress(len(fold_results), len(fold_tasks))
+
+    for fold_accuracies in fold_results:
+        if fold_accuracies is None: continue
+        for k, accuracy in fold_accuracies.items():
             k_accuracies[k].append(accuracy)
             
     summary_results = []
@@ -25,6 +25,56 @@ class Config:
     # Folder untuk menyimpan file yang diunggah
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'static', 'uploads')
     ALLOWED_EXTENSIONS = {'csv', 'xls', 'xlsx'}
+    # Jumlah baris file unggahan yang dibaca dan di-INSERT per potongan
+    UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', 10000))
+    # Lama (detik) jumlah hasil pencarian diingat saat berpindah halaman
+    PAGINATION_COUNT_TTL = int(os.getenv('PAGINATION_COUNT_TTL', 60))
+
+    # Folder untuk artefak model KNN (vectorizer + index) yang dipakai prediksi tunggal
+    MODEL_FOLDER = os.getenv('MODEL_FOLDER', os.path.join(os.getcwd(), 'instance', 'models'))
+
+    # Jumlah proses worker untuk preprocessing dan ukuran potongan per tugas. Default 1: diproses di
+    # proses yang menjalankan job (tanpa process pool per worker web, masing-masing dengan stemmer sendiri).
+    # Naikkan (mis. ke jumlah core) untuk mengaktifkan multiprocessing.
+    PREPROCESSING_WORKERS = int(os.getenv('PREPROCESSING_WORKERS', 1))
+    PREPROCESSING_CHUNK_SIZE = int(os.getenv('PREPROCESSING_CHUNK_SIZE', 500))
+    # Jumlah baris Dataset yang dibaca, diproses, dan di-commit per batch
+    PREPROCESSING_BATCH_SIZE = int(os.getenv('PREPROCESSING_BATCH_SIZE', 5000))
+    # Batas jumlah hasil preprocessing teks unik yang diingat untuk dedup selama satu kali proses (LRU)
+    PREPROCESSING_DEDUP_SIZE = int(os.getenv('PREPROCESSING_DEDUP_SIZE', 50000))
+    # Berapa detik jumlah data tertunda & status resume di halaman preprocessing diingat per proses
+    PREPROCESSING_STATUS_TTL = int(os.getenv('PREPROCESSING_STATUS_TTL', 60))
+
+    # True: catat waktu & jumlah panggilan per langkah preprocessing (ada sedikit overhead)
+    PREPROCESSING_PROFILE = os.getenv('PREPROCESSING_PROFILE', 'false').lower() in ('1', 'true', 'yes')
+
+    # Kamus stem persisten (SQLite) yang dipakai bersama oleh semua proses, dan batas LRU di memori
+    STEM_CACHE_PATH = os.getenv('STEM_CACHE_PATH', os.path.join(os.getcwd(), 'instance', 'stem_cache.sqlite3'))
+    STEM_CACHE_SIZE = int(os.getenv('STEM_CACHE_SIZE', 50000))
+    # True: stemmer Sastrawi dibuat saat aplikasi dimuat (mis. di master gunicorn sebelum fork).
+    # False: dibuat saat pertama kali dipakai.
+    SASTRAWI_WARMUP = os.getenv('SASTRAWI_WARMUP', 'false').lower() in ('1', 'true', 'yes')
+
+    # Jumlah thread yang menjalankan job background (preprocessing, K-Fold, klasifikasi).
+    # Default 1: job berat dijalankan bergantian agar tidak saling berebut tabel yang sama.
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 1))
+    # Interval heartbeat job aktif, dan umur heartbeat (detik) setelah job queued/running dianggap yatim
+    # (prosesnya mati) lalu ditandai gagal
+    JOB_HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', 15))
+    JOB_STALE_SECONDS = int(os.getenv('JOB_STALE_SECONDS', 120))
+
+    # Jumlah proses untuk validasi K-Fold: fold paralel dan potongan prediksi di dalam setiap fold
+    KFOLD_N_JOBS = int(os.getenv('KFOLD_N_JOBS', 1))
+    KNN_PREDICTION_JOBS = int(os.getenv('KNN_PREDICTION_JOBS', 1))
+
+    # Engine KNN: 'auto' (= 'inverted', exact), 'matrix', 'inverted', 'brute', atau 'lsh' (approximate).
+    # Untuk 'lsh': tabel lebih banyak = recall lebih tinggi, bit lebih banyak = lebih cepat.
+    KNN_ALGORITHM = os.getenv('KNN_ALGORITHM', 'auto')
+    # Ukuran blok baris uji/latih, HANYA dipakai engine 'matrix' (memori puncak ~ KNN_BLOCK_SIZE^2 float).
+    # Engine 'inverted' (default) tidak memakai blok: memorinya per dokumen uji sebanding dengan jumlah kandidat.
+    KNN_BLOCK_SIZE = int(os.getenv('KNN_BLOCK_SIZE', 1024))
+    KNN_LSH_TABLES = int(os.getenv('KNN_LSH_TABLES', 16))
+    KNN_LSH_BITS = int(os.getenv('KNN_LSH_BITS', 8))
 
     # Pengaturan tambahan (opsional)
     TESTING = False
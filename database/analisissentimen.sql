@@ -31,7 +31,31 @@ CREATE TABLE `dataset` (
   `id` int NOT NULL,
   `username` varchar(100) DEFAULT NULL,
   `text` text,
-  `created_at` datetime DEFAULT NULL
+  `created_at` datetime DEFAULT NULL,
+  `text_hash` varchar(40) DEFAULT NULL,
+  `preprocessed_hash` varchar(40) DEFAULT NULL,
+  `preprocessed_version` varchar(32) DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Struktur dari tabel `job`
+--
+
+CREATE TABLE `job` (
+  `id` varchar(32) NOT NULL,
+  `kind` varchar(30) NOT NULL,
+  `status` varchar(10) NOT NULL,
+  `progress` float NOT NULL,
+  `message` varchar(255) DEFAULT NULL,
+  `params` text,
+  `result` longtext,
+  `error` text,
+  `created_at` datetime NOT NULL,
+  `started_at` datetime DEFAULT NULL,
+  `finished_at` datetime DEFAULT NULL,
+  `updated_at` datetime DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 -- --------------------------------------------------------
@@ -61,7 +85,25 @@ CREATE TABLE `preprocessing` (
   `text_stopwords` text,
   `text_stem` text,
   `created_at` datetime DEFAULT NULL,
-  `label` varchar(25) DEFAULT NULL
+  `label` varchar(25) DEFAULT NULL,
+  `dataset_id` int DEFAULT NULL,
+  `text_key` varchar(40) DEFAULT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
+
+-- --------------------------------------------------------
+
+--
+-- Struktur dari tabel `stats`
+--
+
+CREATE TABLE `stats` (
+  `id` int NOT NULL,
+  `dataset_total` int NOT NULL,
+  `preprocessing_total` int NOT NULL,
+  `label_positif` int NOT NULL,
+  `label_negatif` int NOT NULL,
+  `label_netral` int NOT NULL,
+  `updated_at` datetime DEFAULT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_general_ci;
 
 --
@@ -72,7 +114,17 @@ CREATE TABLE `preprocessing` (
 -- Indeks untuk tabel `dataset`
 --
 ALTER TABLE `dataset`
-  ADD PRIMARY KEY (`id`);
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `ix_dataset_text_hash` (`text_hash`),
+  ADD FULLTEXT KEY `ft_dataset_search` (`username`,`text`) /*!50100 WITH PARSER `ngram` */ ;
+
+--
+-- Indeks untuk tabel `job`
+--
+ALTER TABLE `job`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `ix_job_kind` (`kind`),
+  ADD KEY `ix_job_status` (`status`);
 
 --
 -- Indeks untuk tabel `klasifikasi`
@@ -84,6 +136,16 @@ ALTER TABLE `klasifikasi`
 -- Indeks untuk tabel `preprocessing`
 --
 ALTER TABLE `preprocessing`
+  ADD PRIMARY KEY (`id`),
+  ADD KEY `ix_preprocessing_dataset_id` (`dataset_id`),
+  ADD KEY `ix_preprocessing_text_key` (`text_key`),
+  ADD KEY `ix_preprocessing_label` (`label`),
+  ADD FULLTEXT KEY `ft_preprocessing_search` (`username`,`text_stem`) /*!50100 WITH PARSER `ngram` */ ;
+
+--
+-- Indeks untuk tabel `stats`
+--
+ALTER TABLE `stats`
   ADD PRIMARY KEY (`id`);
 
 --
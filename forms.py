@@ -10,6 +10,7 @@ class UploadCSVForm(FlaskForm):
         FileRequired(message='File belum dipilih.'),
         FileAllowed(['csv', 'xls', 'xlsx'], 'Hanya file CSV atau Excel yang diizinkan!')
     ])
+    append = BooleanField('Tambahkan ke data yang sudah ada (tanpa menghapus data lama)')
     submit_upload = SubmitField('Unggah File')
 
 class FilterDataForm(FlaskForm):
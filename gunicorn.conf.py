@@ -0,0 +1,30 @@
+# gunicorn.conf.py
+# Contoh: gunicorn -c gunicorn.conf.py web:app
+
+import os
+
+bind = os.getenv('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.getenv('GUNICORN_WORKERS', 2))
+# Aplikasi dimuat di master sebelum fork sehingga stemmer dan cache stem dipakai bersama (copy-on-write)
+preload_app = True
+
+
+def on_starting(server):
+    from preprocessing_utils import warm_up
+    timings = warm_up()
+    server.log.info("Sastrawi siap: " + ", ".join(f"{name} {seconds:.3f} dtk" for name, seconds in timings.items()))
+    from web import app
+    from jobs import recover_interrupted_jobs
+    from search import ensure_search_index
+    from models import db, upgrade_schema
+    with app.app_context():
+        # Tabel dan kolom baru dibuat dulu (database lama mungkin belum punya tabel job)
+        db.create_all()
+        upgrade_schema()
+        # Job yang tertinggal dari proses sebelumnya tidak akan pernah selesai: tandai gagal sekali di master
+        recover_interrupted_jobs()
+        # Index full-text pencarian dibuat sekali jika belum ada
+        ensure_search_index()
+        # Koneksi pool yang dibuka di master tidak boleh diwarisi worker hasil fork (socket MySQL dipakai bersama)
+        db.session.remove()
+        db.engine.dispose()
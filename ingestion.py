@@ -0,0 +1,169 @@
+# ingestion.py
+
+import re
+import time
+import warnings
+from itertools import chain, islice
+import pandas as pd
+from sqlalchemy.exc import SQLAlchemyError
+from models import db, Dataset, bulk_insert
+from preprocessing_utils import content_hash
+from stats import adjust_stats
+
+REQUIRED_COLUMNS = {'username', 'text', 'created_at'}
+USERNAME_MAX_LENGTH = Dataset.__table__.c.username.type.length
+# Jumlah contoh baris yang ditolak yang disimpan di ringkasan
+MAX_REJECTED_SAMPLES = 20
+
+_BAD_LINE_PATTERN = re.compile(r'Skipping line (\d+): (.+)')
+
+
+def _detect_separator(filepath, encoding='utf-8'):
+    """Menebak pemisah kolom CSV dari baris header (',', ';', tab, atau '|')."""
+    with open(filepath, encoding=encoding, errors='replace') as f:
+        header = f.readline()
+    return max([',', ';', '\t', '|'], key=header.count)
+
+
+def _iter_csv_chunks(filepath, chunk_size, bad_lines):
+    try:
+        reader = pd.read_csv(filepath, encoding='utf-8', sep=_detect_separator(filepath), chunksize=chunk_size,
+                             dtype=str, keep_default_na=False, on_bad_lines='warn')
+    except pd.errors.EmptyDataError:
+        return # File tanpa header sama sekali
+    while True:
+        # Baris dengan jumlah kolom salah dilewati parser dan dilaporkan sebagai ParserWarning
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always', pd.errors.ParserWarning)
+            chunk = next(reader, None)
+        for warning in caught:
+            for line_no, reason in _BAD_LINE_PATTERN.findall(str(warning.message)):
+                bad_lines.append((int(line_no), reason.strip()))
+        if chunk is None:
+            return
+        yield chunk
+
+
+def _iter_excel_chunks(filepath, chunk_size):
+    if not filepath.lower().endswith('.xlsx'):
+        # Format .xls lama tidak bisa dibaca bertahap; dibaca sekali lalu dipotong
+        df = pd.read_excel(filepath)
+        for start in range(0, len(df), chunk_size):
+            yield df.iloc[start:start + chunk_size]
+        return
+    from openpyxl import load_workbook
+    workbook = load_workbook(filepath, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(col) if col is not None else '' for col in next(rows, ())]
+        while True:
+            block = list(islice(rows, chunk_size))
+            if not block:
+                return
+            yield pd.DataFrame(block, columns=header)
+    finally:
+        workbook.close()
+
+
+def iter_upload_chunks(filepath, chunk_size, bad_lines):
+    """DataFrame per potongan chunk_size baris dari file CSV/Excel; baris CSV rusak dicatat di bad_lines."""
+    if filepath.rsplit('.', 1)[-1].lower() in ('xls', 'xlsx'):
+        return _iter_excel_chunks(filepath, chunk_size)
+    return _iter_csv_chunks(filepath, chunk_size, bad_lines)
+
+
+def _prepare_chunk(chunk, first_row_no, rejected):
+    """
+    Mengubah satu potongan DataFrame menjadi list dict siap INSERT (operasi per kolom).
+    Baris tanpa teks, dengan username terlalu panjang, atau dengan created_at kosong/tidak valid
+    (Preprocessing.created_at wajib diisi) ditolak dan dicatat di rejected.
+    """
+    chunk = chunk.rename(columns=lambda col: str(col).strip().lower())
+    texts = chunk['text'].fillna('').astype(str).str.strip()
+    usernames = chunk['username'].fillna('').astype(str)
+    created = pd.to_datetime(chunk['created_at'].replace('', None), errors='coerce', format='mixed')
+    created = created.astype(object).where(created.notna(), None)
+
+    valid = (texts != '') & (usernames.str.len() <= USERNAME_MAX_LENGTH) & created.notna()
+    for position in (~valid).to_numpy().nonzero()[0]:
+        if texts.iat[position] == '': reason = 'teks kosong'
+        elif len(usernames.iat[position]) > USERNAME_MAX_LENGTH: reason = f'username lebih dari {USERNAME_MAX_LENGTH} karakter'
+        else: reason = 'created_at kosong atau tidak valid'
+        rejected.append((first_row_no + int(position), reason))
+    return [{'username': username, 'text': text, 'text_hash': content_hash(text), 'created_at': created_at}
+            for username, text, created_at in zip(usernames[valid], texts[valid], created[valid])]
+
+
+def _insert_rows(rows, first_row_no, rejected, commit=True):
+    """
+    INSERT banyak baris sekaligus (bulk_insert) di dalam savepoint. Jika batch gagal, baris dicoba
+    satu per satu (masing-masing dengan savepoint) agar hanya baris rusak yang ditolak.
+    commit=False: perubahan dibiarkan di transaksi yang sedang berjalan.
+    """
+    table = Dataset.__table__
+    try:
+        with db.session.begin_nested():
+            bulk_insert(Dataset, rows)
+            adjust_stats(dataset=len(rows))
+        if commit: db.session.commit()
+        return len(rows)
+    except SQLAlchemyError:
+        pass
+    inserted = 0
+    for offset, row in enumerate(rows):
+        try:
+            with db.session.begin_nested():
+                db.session.execute(table.insert(), [row])
+                adjust_stats(dataset=1)
+            inserted += 1
+        except SQLAlchemyError as e:
+            rejected.append((first_row_no + offset, f'ditolak database: {str(e.orig if hasattr(e, "orig") else e)[:100]}'))
+    if commit: db.session.commit()
+    return inserted
+
+
+def ingest_upload(filepath, chunk_size=10000, before_insert=None):
+    """
+    Memasukkan file CSV/Excel ke tabel Dataset secara bertahap: file dibaca per potongan,
+    created_at di-parse per kolom, dan baris dimasukkan dengan executemany per potongan.
+    Baris rusak ditolak tanpa membatalkan seluruh impor.
+    Tanpa before_insert, setiap potongan di-commit sendiri (mode tambah). before_insert() (mis.
+    menghapus data lama, tanpa commit) dipanggil sekali setelah header tervalidasi; penghapusan itu
+    dan semua INSERT lalu di-commit dalam satu transaksi, sehingga file yang gagal dibaca di tengah
+    jalan tidak meninggalkan impor setengah jadi dan data lama tetap utuh.
+    ValueError jika file kosong atau kolom wajib tidak ada.
+    Mengembalikan ringkasan: inserted, rejected (jumlah), rejected_samples, seconds, rows_per_sec.
+    """
+    start_time = time.perf_counter()
+    bad_lines, rejected = [], []
+    chunks = iter_upload_chunks(filepath, chunk_size, bad_lines)
+    first = next(chunks, None)
+    if first is None or (first.empty and not bad_lines):
+        raise ValueError('File Excel/CSV tidak berisi data.')
+    missing_cols = REQUIRED_COLUMNS - {str(col).strip().lower() for col in first.columns}
+    if missing_cols:
+        raise ValueError(f'Kolom pada file Excel/CSV hilang: {", ".join(sorted(missing_cols))}.')
+
+    atomic = before_insert is not None
+    inserted, row_no = 0, 1
+    try:
+        if atomic:
+            before_insert()
+        for chunk in chain([first], chunks):
+            rows = _prepare_chunk(chunk, row_no, rejected)
+            if rows:
+                inserted += _insert_rows(rows, row_no, rejected, commit=not atomic)
+            row_no += len(chunk)
+            elapsed = time.perf_counter() - start_time
+            print(f"Unggah: {inserted} baris dimasukkan, {len(rejected) + len(bad_lines)} ditolak ({inserted / elapsed if elapsed else 0:.0f} baris/detik).")
+        if atomic:
+            db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    seconds = time.perf_counter() - start_time
+    samples = [f'baris file {line_no}: {reason}' for line_no, reason in bad_lines]
+    samples += [f'data ke-{row_no}: {reason}' for row_no, reason in rejected]
+    return {'inserted': inserted, 'rejected': len(bad_lines) + len(rejected), 'rejected_samples': samples[:MAX_REJECTED_SAMPLES],
+            'seconds': seconds, 'rows_per_sec': inserted / seconds if seconds else 0.0}
@@ -0,0 +1,166 @@
+# jobs.py
+
+import json
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from sqlalchemy import func
+from models import db, Job
+
+# Handler per jenis job: handler(app, params, report) -> dict hasil (harus bisa di-JSON-kan)
+JOB_HANDLERS = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+ACTIVE_STATUSES = ('queued', 'running')
+# Id job milik proses ini yang masih antre/berjalan; heartbeat-nya diperbarui oleh thread _heartbeat
+_active_ids = set()
+_active_lock = threading.Lock()
+
+
+def register_job(kind):
+    """Decorator untuk mendaftarkan fungsi sebagai handler job jenis 'kind'."""
+    def decorator(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return decorator
+
+
+def _get_executor(app):
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=app.config.get('JOB_WORKERS', 1), thread_name_prefix='job')
+            threading.Thread(target=_heartbeat, args=(app,), name='job-heartbeat', daemon=True).start()
+        return _executor
+
+
+def _heartbeat(app):
+    """Memperbarui Job.updated_at semua job aktif milik proses ini setiap JOB_HEARTBEAT_SECONDS."""
+    interval = app.config.get('JOB_HEARTBEAT_SECONDS', 15)
+    while True:
+        time.sleep(interval)
+        with _active_lock:
+            ids = list(_active_ids)
+        if not ids: continue
+        try:
+            with app.app_context(), db.engine.begin() as conn:
+                conn.execute(Job.__table__.update()
+                             .where(Job.__table__.c.id.in_(ids), Job.__table__.c.status.in_(ACTIVE_STATUSES))
+                             .values(updated_at=datetime.now()))
+        except Exception as e:
+            # Database sibuk/terkunci: dicoba lagi pada interval berikutnya
+            app.logger.warning(f"Heartbeat job gagal: {e}")
+
+
+def _update_job(job_id, **values):
+    values.setdefault('updated_at', datetime.now())
+    # Lewat koneksi terpisah agar tidak ikut transaksi milik handler
+    with db.engine.begin() as conn:
+        conn.execute(Job.__table__.update().where(Job.__table__.c.id == job_id).values(**values))
+
+
+def _run_job(app, job_id):
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        kind, params = job.kind, json.loads(job.params or '{}')
+        db.session.remove()
+        _update_job(job_id, status='running', started_at=datetime.now(), message='Sedang berjalan...')
+        last_report = [0.0]
+
+        def report(done, total, message=None):
+            """Menyimpan progres (dibatasi maksimal 2x per detik agar tidak membebani database)."""
+            now = time.monotonic()
+            if now - last_report[0] < 0.5 and done < total: return
+            last_report[0] = now
+            values = {'progress': min(1.0, done / total) if total else 0.0}
+            if message: values['message'] = message[:255]
+            _update_job(job_id, **values)
+
+        try:
+            result = JOB_HANDLERS[kind](app, params, report)
+            _update_job(job_id, status='done', progress=1.0, finished_at=datetime.now(),
+                        result=json.dumps(result), message=(result or {}).get('message', 'Selesai.')[:255])
+        except Exception as e:
+            db.session.rollback()
+            app.logger.error(f"Job {kind} {job_id} gagal: {e}", exc_info=True)
+            _update_job(job_id, status='failed', finished_at=datetime.now(), error=str(e), message='Gagal.')
+        finally:
+            db.session.remove()
+            with _active_lock:
+                _active_ids.discard(job_id)
+
+
+def submit_job(app, kind, params=None):
+    """
+    Mendaftarkan job baru ke tabel job lalu menjalankannya di thread pool lokal (JOB_WORKERS).
+    Jika job dengan jenis dan parameter yang sama masih antre/berjalan, job tersebut yang
+    dikembalikan agar pekerjaan berat tidak dijalankan dua kali. Mengembalikan id job.
+    """
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Jenis job tidak dikenal: {kind}")
+    fail_stale_jobs(app.config.get('JOB_STALE_SECONDS', 120))
+    # Parameter disimpan dalam bentuk kanonik (kunci terurut) agar bisa dibandingkan langsung
+    params_json = json.dumps(params or {}, sort_keys=True)
+    active = Job.query.filter(Job.kind == kind, Job.params == params_json, Job.status.in_(ACTIVE_STATUSES)).first()
+    if active is not None:
+        return active.id
+    now = datetime.now()
+    job = Job(id=uuid.uuid4().hex, kind=kind, status='queued', progress=0.0, message='Menunggu giliran...',
+              params=params_json, created_at=now, updated_at=now)
+    db.session.add(job)
+    db.session.commit()
+    executor = _get_executor(app)
+    with _active_lock:
+        _active_ids.add(job.id)
+    executor.submit(_run_job, app, job.id)
+    return job.id
+
+
+def job_status(job_id):
+    """Status job sebagai dict (tanpa hasil lengkap); None jika tidak ditemukan."""
+    job = db.session.get(Job, job_id)
+    if job is None: return None
+    if job.status in ACTIVE_STATUSES and fail_stale_jobs(current_app.config.get('JOB_STALE_SECONDS', 120)):
+        db.session.refresh(job)
+    return {'id': job.id, 'kind': job.kind, 'status': job.status, 'progress': job.progress, 'message': job.message,
+            'error': job.error, 'created_at': job.created_at.isoformat() if job.created_at else None,
+            'finished_at': job.finished_at.isoformat() if job.finished_at else None}
+
+
+def job_result(job_id):
+    """Hasil job yang sudah selesai (dict), atau None."""
+    job = db.session.get(Job, job_id)
+    if job is None or job.status != 'done' or not job.result: return None
+    return json.loads(job.result)
+
+
+def recover_interrupted_jobs():
+    """Menandai job yang tertinggal 'queued'/'running' dari proses sebelumnya sebagai gagal."""
+    count = (Job.query.filter(Job.status.in_(['queued', 'running']))
+             .update({Job.status: 'failed', Job.error: 'Dihentikan karena aplikasi dimulai ulang.', Job.finished_at: datetime.now()},
+                     synchronize_session=False))
+    db.session.commit()
+    return count
+
+
+def fail_stale_jobs(stale_seconds):
+    """
+    Menandai job 'queued'/'running' yang heartbeat-nya (updated_at, atau created_at untuk baris lama)
+    lebih tua dari stale_seconds sebagai gagal: proses pemiliknya sudah mati (mis. worker dihentikan),
+    sehingga job itu tidak akan pernah selesai. Job milik proses ini tidak disentuh. Mengembalikan jumlah job.
+    """
+    table = Job.__table__
+    cutoff = datetime.now() - timedelta(seconds=stale_seconds)
+    with _active_lock:
+        own_ids = list(_active_ids)
+    query = table.update().where(table.c.status.in_(ACTIVE_STATUSES),
+                                 func.coalesce(table.c.updated_at, table.c.created_at) < cutoff)
+    if own_ids: query = query.where(table.c.id.notin_(own_ids))
+    now = datetime.now()
+    with db.engine.begin() as conn:
+        return conn.execute(query.values(status='failed', error='Proses yang menjalankan job ini berhenti.',
+                                         message='Gagal.', finished_at=now, updated_at=now)).rowcount
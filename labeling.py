@@ -0,0 +1,112 @@
+# labeling.py
+
+import time
+from collections import Counter
+import pandas as pd
+from sqlalchemy import Table, Column, MetaData, Integer, String, select, exists, func, update, text
+from models import db, Preprocessing
+from preprocessing_utils import content_hash
+from ingestion import iter_upload_chunks
+from stats import adjust_stats, label_change
+
+VALID_LABELS = ('positif', 'negatif', 'netral')
+LABEL_FILE_COLUMNS = {'text', 'sentimen'}
+
+
+def label_key(value):
+    """Kunci pencocokan teks file label dengan Preprocessing.text: hash teks setelah strip()."""
+    return content_hash('' if value is None else str(value).strip())
+
+
+def backfill_label_keys(batch_size=5000):
+    """Mengisi Preprocessing.text_key untuk baris lama yang belum punya kunci. Mengembalikan jumlah baris."""
+    total = 0
+    while True:
+        rows = (db.session.query(Preprocessing.id, Preprocessing.text)
+                .filter(Preprocessing.text_key.is_(None)).order_by(Preprocessing.id).limit(batch_size).all())
+        if not rows: return total
+        db.session.bulk_update_mappings(Preprocessing, [{'id': row.id, 'text_key': label_key(row.text)} for row in rows])
+        db.session.commit()
+        total += len(rows)
+
+
+def _read_label_file(filepath, chunk_size):
+    """
+    Membaca file label per potongan dan meringkasnya per kunci teks: occurrences (jumlah baris file)
+    dan label (label valid terakhir di file, atau None jika tidak ada yang valid).
+    """
+    keys, labels, columns = [], [], None
+    for chunk in iter_upload_chunks(filepath, chunk_size, []):
+        chunk = chunk.rename(columns=lambda col: str(col).strip().lower())
+        if columns is None:
+            columns = set(chunk.columns)
+            if not LABEL_FILE_COLUMNS.issubset(columns):
+                raise ValueError('File label harus memiliki kolom "text" dan "sentimen".')
+        keys.append(chunk['text'].fillna('').astype(str).str.strip().map(content_hash))
+        labels.append(chunk['sentimen'].fillna('').astype(str).str.strip().str.lower())
+    if columns is None:
+        raise ValueError('File label harus memiliki kolom "text" dan "sentimen".')
+    df = pd.DataFrame({'text_key': pd.concat(keys, ignore_index=True), 'label': pd.concat(labels, ignore_index=True)})
+    df['label'] = df['label'].where(df['label'].isin(VALID_LABELS))
+    # Jika satu teks muncul berkali-kali, label valid terakhir yang dipakai (sama seperti perulangan baris per baris)
+    grouped = df.groupby('text_key', sort=False)
+    summary = pd.DataFrame({'occurrences': grouped.size(), 'label': grouped['label'].last()}).reset_index()
+    return [{'text_key': key, 'label': label if isinstance(label, str) else None, 'occurrences': int(count)}
+            for key, label, count in zip(summary['text_key'], summary['label'], summary['occurrences'])]
+
+
+def apply_labels(filepath, chunk_size=10000):
+    """
+    Menerapkan label dari file CSV/Excel (kolom 'text' dan 'sentimen') ke tabel Preprocessing
+    secara set-based: isi file diringkas per kunci teks, dimuat ke tabel staging sementara,
+    lalu label diterapkan dengan satu UPDATE yang di-join ke staging. Semua baris Preprocessing
+    dengan teks yang sama ikut dilabeli. ValueError jika kolom wajib tidak ada.
+    Mengembalikan ringkasan: matched (baris Preprocessing yang dilabeli), unmatched (baris file
+    yang teksnya tidak ditemukan), file_rows, dan seconds.
+    """
+    start_time = time.perf_counter()
+    staged = _read_label_file(filepath, chunk_size)
+    backfill_label_keys()
+
+    staging = Table('label_staging', MetaData(),
+                    Column('text_key', String(40), primary_key=True),
+                    Column('label', String(25), nullable=True),
+                    Column('occurrences', Integer, nullable=False),
+                    prefixes=['TEMPORARY'])
+    preprocessing = Preprocessing.__table__
+    # Tabel sementara hanya terlihat di koneksi ini: semua langkah dijalankan dalam satu transaksi
+    drop_staging = text(f"DROP {'TEMPORARY ' if db.engine.name == 'mysql' else ''}TABLE IF EXISTS label_staging")
+    conn = db.session.connection()
+    try:
+        conn.execute(drop_staging) # Sisa dari proses sebelumnya yang gagal
+        staging.create(conn)
+        for start in range(0, len(staged), chunk_size):
+            conn.execute(staging.insert(), staged[start:start + chunk_size])
+        unmatched = conn.execute(
+            select(func.coalesce(func.sum(staging.c.occurrences), 0))
+            .where(~exists().where(preprocessing.c.text_key == staging.c.text_key))).scalar()
+        # Perpindahan label lama -> baru, untuk penghitung di tabel stats
+        transitions = conn.execute(
+            select(preprocessing.c.label, staging.c.label, func.count())
+            .join(staging, preprocessing.c.text_key == staging.c.text_key)
+            .where(staging.c.label.isnot(None))
+            .group_by(preprocessing.c.label, staging.c.label)).all()
+        matched = sum(count for _, _, count in transitions)
+        conn.execute(update(preprocessing)
+                     .where(preprocessing.c.text_key == staging.c.text_key, staging.c.label.isnot(None))
+                     .values(label=staging.c.label))
+        conn.execute(drop_staging)
+        labels = Counter()
+        for old_label, new_label, count in transitions:
+            for label, delta in label_change(old_label, new_label).items():
+                labels[label] += delta * count
+        adjust_stats(labels=labels)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    seconds = time.perf_counter() - start_time
+    file_rows = sum(row['occurrences'] for row in staged)
+    print(f"Pelabelan: {file_rows} baris file, {matched} data dilabeli, {unmatched} tidak ditemukan ({seconds:.2f} detik).")
+    return {'matched': int(matched), 'unmatched': int(unmatched), 'file_rows': file_rows, 'seconds': seconds}
@@ -0,0 +1,254 @@
+# model_registry.py
+
+import hashlib
+import os
+import pickle
+import threading
+import uuid
+from contextlib import contextmanager
+try:
+    import fcntl
+except ImportError: # Windows: server pengembangan satu proses, kunci antarproses tidak diperlukan
+    fcntl = None
+
+from models import db, Preprocessing
+from classification_utils import TFIDFVectorizer, KNeighborsClassifier, knn_options_from_config
+
+MODEL_FILE_PREFIX = 'knn_model_'
+VERSION_FILE = 'labels.version'
+LOCK_FILE = 'labels.lock'
+_FINGERPRINT_MOD = 1 << 128
+
+# Cache di memori per proses worker: artefak terakhir beserta versi label saat dimuat
+_cache = {'version': None, 'artifact': None}
+_lock = threading.Lock()
+
+
+# Bobot vektor lama dihitung dengan IDF saat dibuat; jika baris yang berubah sejak
+# pembobotan terakhir melebihi rasio ini, seluruh vektor dihitung ulang dengan IDF terbaru.
+REWEIGHT_RATIO = 0.1
+
+
+class ModelArtifact:
+    """
+    Vectorizer TF-IDF + index KNN yang sudah dilatih pada seluruh data berlabel.
+    Mendukung pembaruan inkremental per baris (upsert/remove) sehingga perubahan label
+    dari halaman pelabelan tidak perlu melatih ulang seluruh model.
+    """
+    def __init__(self, fingerprint, vectorizer, knn, row_ids, docs):
+        # fingerprint: kunci file artefak ini di MODEL_FOLDER
+        self.fingerprint, self.vectorizer, self.knn = fingerprint, vectorizer, knn
+        self.row_ids, self.docs = list(row_ids), list(docs)
+        self._positions = {row_id: pos for pos, row_id in enumerate(self.row_ids)}
+        self._stale_rows = 0
+        self._content = sum(map(_row_hash, self.row_ids, self.knn.y_train_, self.docs)) % _FINGERPRINT_MOD
+
+    @property
+    def n_samples(self):
+        return len(self.row_ids)
+
+    def predict(self, texts, k):
+        X_vec = self.vectorizer.transform(texts, sparse=True)
+        return self.knn.predict(X_vec, k=k)
+
+    def upsert(self, row_id, text_stem, label):
+        """Menambahkan baris berlabel baru atau memperbarui label/teks baris yang sudah ada."""
+        text_stem = text_stem or ''
+        pos = self._positions.get(row_id)
+        if pos is not None and self.docs[pos] == text_stem:
+            # Hanya label yang berubah: statistik TF-IDF dan vektor tetap sama
+            self._content = (self._content - _row_hash(row_id, self.knn.y_train_[pos], text_stem)
+                             + _row_hash(row_id, label, text_stem)) % _FINGERPRINT_MOD
+            self.knn.y_train_[pos] = label
+            return
+        if pos is not None: self.remove(row_id)
+        self.vectorizer.partial_fit([text_stem])
+        self.knn.partial_fit(self.vectorizer.transform([text_stem], sparse=True), [label])
+        self._positions[row_id] = len(self.row_ids)
+        self.row_ids.append(row_id)
+        self.docs.append(text_stem)
+        self._content = (self._content + _row_hash(row_id, label, text_stem)) % _FINGERPRINT_MOD
+        self._mark_stale()
+
+    def remove(self, row_id):
+        pos = self._positions.pop(row_id, None)
+        if pos is None: return
+        self._content = (self._content - _row_hash(row_id, self.knn.y_train_[pos], self.docs[pos])) % _FINGERPRINT_MOD
+        self.vectorizer.remove_documents([self.docs[pos]])
+        self.knn.remove_rows([pos])
+        del self.row_ids[pos], self.docs[pos]
+        self._positions = {rid: i for i, rid in enumerate(self.row_ids)}
+        self._mark_stale()
+
+    def _mark_stale(self):
+        self._stale_rows += 1
+        if self._stale_rows > REWEIGHT_RATIO * max(self.n_samples, 1):
+            self.reweight()
+
+    def content_fingerprint(self):
+        """Sidik jari isi artefak ini (diperbarui per baris saat upsert/remove), sama seperti compute_labeled_fingerprint."""
+        return f'{self._content:032x}'
+
+    def reweight(self):
+        """Menghitung ulang semua vektor latih dengan IDF terbaru (tanpa akses database)."""
+        self.knn.fit(self.vectorizer.transform(self.docs, sparse=True), self.knn.y_train_)
+        self._stale_rows = 0
+
+
+def _labeled_rows_query():
+    return (db.session.query(Preprocessing.id, Preprocessing.label, Preprocessing.text_stem)
+            .filter(Preprocessing.label.isnot(None))
+            .order_by(Preprocessing.id.asc()))
+
+
+def _row_hash(row_id, label, text_stem):
+    digest = hashlib.sha256(f"{row_id}\x1f{label}\x1f{text_stem or ''}".encode('utf-8')).digest()
+    return int.from_bytes(digest[:16], 'big')
+
+
+def compute_labeled_fingerprint():
+    """
+    Sidik jari data berlabel: jumlah (mod 2^128) hash (id, label, text_stem) setiap baris berlabel.
+    Tidak bergantung urutan, sehingga artefak bisa memperbaruinya per baris tanpa menghitung ulang semuanya.
+    """
+    total = sum(_row_hash(row.id, row.label, row.text_stem) for row in _labeled_rows_query().yield_per(5000))
+    return f'{total % _FINGERPRINT_MOD:032x}'
+
+
+def _model_folder(app):
+    folder = app.config['MODEL_FOLDER']
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _read_version(folder):
+    """(versi, kunci artefak terbaru atau None) dari VERSION_FILE; (None, None) jika belum ada."""
+    try:
+        with open(os.path.join(folder, VERSION_FILE), encoding='utf-8') as f:
+            parts = f.read().split()
+    except FileNotFoundError:
+        return None, None
+    return (parts[0] if parts else None), (parts[1] if len(parts) > 1 else None)
+
+
+@contextmanager
+def _folder_lock(folder):
+    """Kunci antarproses (worker gunicorn) untuk membaca-memperbarui-menyimpan artefak dan VERSION_FILE."""
+    with open(os.path.join(folder, LOCK_FILE), 'a') as f:
+        if fcntl is not None: fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None: fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _load_artifact(folder, key):
+    try:
+        with open(os.path.join(folder, f"{MODEL_FILE_PREFIX}{key}.pkl"), 'rb') as f:
+            return pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+        return None
+
+
+def _build_artifact(fingerprint, knn_options=None):
+    rows = _labeled_rows_query().all()
+    X_full, y_full = [row.text_stem or '' for row in rows], [row.label for row in rows]
+    vectorizer = TFIDFVectorizer().fit(X_full)
+    knn = KNeighborsClassifier(**(knn_options or {})).fit(vectorizer.transform(X_full, sparse=True), y_full)
+    return ModelArtifact(fingerprint, vectorizer, knn, [row.id for row in rows], X_full)
+
+
+def _save_artifact(folder, artifact):
+    path = os.path.join(folder, f"{MODEL_FILE_PREFIX}{artifact.fingerprint}.pkl")
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(artifact, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, path)  # Atomik: worker lain tidak pernah membaca file setengah jadi
+    # Artefak lama tidak akan dipakai lagi, kecuali yang masih ditunjuk VERSION_FILE
+    keep = {os.path.basename(path), f"{MODEL_FILE_PREFIX}{_read_version(folder)[1]}.pkl"}
+    for name in os.listdir(folder):
+        if name.startswith(MODEL_FILE_PREFIX) and name.endswith('.pkl') and name not in keep:
+            try:
+                os.remove(os.path.join(folder, name))
+            except OSError:
+                pass
+
+
+def get_model(app):
+    """
+    Mengembalikan ModelArtifact untuk data berlabel saat ini.
+    Urutan: cache memori (jika versi label belum berubah) -> artefak yang ditunjuk VERSION_FILE
+    (hasil update_model terakhir, sehingga semua worker memakai model yang sama) -> file di
+    MODEL_FOLDER dengan fingerprint data berlabel yang sama -> latih ulang lalu simpan ke disk.
+    Mengembalikan None jika belum ada data berlabel.
+    """
+    folder = _model_folder(app)
+    version, key = _read_version(folder)
+    with _lock:
+        if _cache['artifact'] is not None and _cache['version'] == version:
+            return _cache['artifact']
+        artifact = _load_artifact(folder, key) if key else None
+        if artifact is None:
+            fingerprint = compute_labeled_fingerprint()
+            artifact = _load_artifact(folder, fingerprint)
+        if artifact is None:
+            artifact = _build_artifact(fingerprint, knn_options_from_config(app.config))
+            if artifact.n_samples == 0:
+                return None
+            _save_artifact(folder, artifact)
+        _cache['version'], _cache['artifact'] = version, artifact
+        return artifact
+
+
+def _write_version(folder, key=None):
+    version = uuid.uuid4().hex
+    tmp_path = os.path.join(folder, f"{VERSION_FILE}.{version}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(f"{version} {key}" if key else version)
+    os.replace(tmp_path, os.path.join(folder, VERSION_FILE))
+    return version
+
+
+def update_model(app, upserts=None, removals=None):
+    """
+    Menerapkan perubahan label beberapa baris (sudah di-commit) ke artefak terbaru.
+    upserts: dict {id: (text_stem, label)}, removals: iterable id yang labelnya dihapus; nilai akhir
+    setiap id dibaca ulang dari database sehingga urutan panggilan antar worker tidak berpengaruh.
+    Di bawah kunci antarproses, artefak terbaru (cache worker ini atau file yang ditunjuk VERSION_FILE)
+    diperbarui per baris, disimpan dengan kunci barunya sendiri, lalu VERSION_FILE menunjuk ke sana,
+    sehingga semua worker memuat artefak yang persis sama. Bobot IDF baris lama baru dihitung ulang
+    setelah REWEIGHT_RATIO baris berubah; karena itu artefak ini tidak disimpan dengan fingerprint
+    data berlabel (kunci model hasil latih ulang penuh). Jika belum ada artefak, model diinvalidasi.
+    """
+    row_ids = set(upserts or {}) | set(removals or ())
+    if not row_ids: return
+    folder = _model_folder(app)
+    with _lock, _folder_lock(folder):
+        version, key = _read_version(folder)
+        artifact = _cache['artifact'] if _cache['version'] == version else None
+        if artifact is None and key:
+            artifact = _load_artifact(folder, key)
+        if artifact is not None:
+            current = {row.id: row for row in (db.session.query(Preprocessing.id, Preprocessing.label, Preprocessing.text_stem)
+                                               .filter(Preprocessing.id.in_(row_ids)))}
+            for row_id in row_ids:
+                row = current.get(row_id)
+                if row is None or row.label is None: artifact.remove(row_id)
+                else: artifact.upsert(row_id, row.text_stem, row.label)
+            artifact.fingerprint = f"{artifact.content_fingerprint()}-{uuid.uuid4().hex[:8]}"
+            _save_artifact(folder, artifact)
+            _cache['version'], _cache['artifact'] = _write_version(folder, artifact.fingerprint), artifact
+    if artifact is None:
+        invalidate_model(app)
+
+
+def invalidate_model(app):
+    """
+    Dipanggil setiap kali label berubah tanpa update_model. Menulis versi label baru (tanpa artefak)
+    ke MODEL_FOLDER sehingga semua worker memeriksa ulang fingerprint pada prediksi berikutnya.
+    """
+    folder = _model_folder(app)
+    with _lock:
+        with _folder_lock(folder):
+            _write_version(folder)
+        _cache['version'], _cache['artifact'] = None, None
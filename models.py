@@ -1,6 +1,7 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
+from sqlalchemy import inspect, text
 
 db = SQLAlchemy()
 
@@ -11,6 +12,10 @@ class Dataset(db.Model):
     text = db.Column(db.Text, nullable=False)
     created_at = db.Column(db.DateTime, nullable=True)
     # Kolom 'label' dihapus dari model ini
+    text_hash = db.Column(db.String(40), nullable=True, index=True) # Hash isi 'text'
+    # Hash teks & versi kamus saat baris ini terakhir dipreprocessing (untuk mode inkremental)
+    preprocessed_hash = db.Column(db.String(40), nullable=True)
+    preprocessed_version = db.Column(db.String(32), nullable=True)
 
 class Preprocessing(db.Model):
     __tablename__ = 'preprocessing'
@@ -21,4 +26,67 @@ class Preprocessing(db.Model):
     text_stopwords = db.Column(db.Text, nullable=True)
     text_stem = db.Column(db.Text, nullable=True) # Teks bersih untuk klasifikasi
     created_at = db.Column(db.DateTime, nullable=False)
-    label = db.Column(db.String(25), nullable=True) # Label hanya ada di sini
\ No newline at end of file
+    label = db.Column(db.String(25), nullable=True, index=True) # Label hanya ada di sini
+    dataset_id = db.Column(db.Integer, nullable=True, index=True) # Baris Dataset asal, dipakai sebagai checkpoint preprocessing
+    text_key = db.Column(db.String(40), nullable=True, index=True) # Hash 'text' setelah strip(), untuk pelabelan dari file
+
+class Job(db.Model):
+    __tablename__ = 'job'
+    id = db.Column(db.String(32), primary_key=True) # uuid4 hex
+    kind = db.Column(db.String(30), nullable=False, index=True) # 'preprocessing', 'kfold', 'classify'
+    status = db.Column(db.String(10), nullable=False, default='queued', index=True) # queued/running/done/failed
+    progress = db.Column(db.Float, nullable=False, default=0.0) # 0.0 - 1.0
+    message = db.Column(db.String(255), nullable=True)
+    params = db.Column(db.Text, nullable=True) # JSON
+    result = db.Column(db.Text(length=2**32 - 1), nullable=True) # JSON (LONGTEXT di MySQL), disimpan agar bisa diambil kembali nanti
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, nullable=True) # Heartbeat proses pemilik job; job aktif yang berhenti diperbarui dianggap yatim
+
+class Stats(db.Model):
+    __tablename__ = 'stats'
+    id = db.Column(db.Integer, primary_key=True) # Hanya satu baris (id=1), dijaga oleh stats.py
+    dataset_total = db.Column(db.Integer, nullable=False, default=0)
+    preprocessing_total = db.Column(db.Integer, nullable=False, default=0)
+    label_positif = db.Column(db.Integer, nullable=False, default=0)
+    label_negatif = db.Column(db.Integer, nullable=False, default=0)
+    label_netral = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, nullable=True)
+
+
+def bulk_insert(model, rows):
+    """INSERT banyak baris (list dict dengan kunci yang sama) dalam transaksi session aktif, tanpa commit."""
+    if not rows: return
+    db.session.execute(model.__table__.insert(), rows)
+
+
+# Kolom yang ditambahkan setelah tabel mungkin sudah dibuat; db.create_all() tidak mengubah tabel lama
+_UPGRADE_COLUMNS = {
+    'dataset': [
+        ('text_hash', 'VARCHAR(40)', 'ix_dataset_text_hash'),
+        ('preprocessed_hash', 'VARCHAR(40)', None),
+        ('preprocessed_version', 'VARCHAR(32)', None),
+    ],
+    'preprocessing': [
+        ('dataset_id', 'INTEGER', 'ix_preprocessing_dataset_id'),
+        ('text_key', 'VARCHAR(40)', 'ix_preprocessing_text_key'),
+        ('label', 'VARCHAR(25)', 'ix_preprocessing_label'),
+    ],
+    'job': [('updated_at', 'DATETIME', None)],
+}
+
+def upgrade_schema():
+    """Menambahkan kolom/index baru ke tabel yang sudah ada. Aman dipanggil berulang kali."""
+    inspector = inspect(db.engine)
+    for table, columns in _UPGRADE_COLUMNS.items():
+        if not inspector.has_table(table): continue
+        existing = {col['name'] for col in inspector.get_columns(table)}
+        existing_indexes = {idx['name'] for idx in inspector.get_indexes(table)}
+        for name, ddl_type, index_name in columns:
+            if name not in existing:
+                db.session.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+            if index_name and index_name not in existing_indexes:
+                db.session.execute(text(f"CREATE INDEX {index_name} ON {table} ({name})"))
+    db.session.commit()
\ No newline at end of file
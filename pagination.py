@@ -0,0 +1,100 @@
+# pagination.py
+
+import time
+from flask import request
+from flask_sqlalchemy.pagination import Pagination, QueryPagination
+
+# Argumen URL posisi halaman keyset: after/before = id batas, skip = baris yang dilewati dari batas itu
+CURSOR_ARGS = ('after', 'before', 'skip', 'last')
+# Halaman yang lebih jauh dari ini dari halaman aktif dituju lewat ujung akhir (last=1), bukan skip
+_MAX_SKIP_PAGES = 3
+
+_count_cache = {}
+_COUNT_CACHE_SIZE = 256
+
+
+def list_args_from_request():
+    """Argumen halaman daftar (page, cursor keyset, per_page, search) dari request aktif, untuk redirect kembali ke halaman yang sama."""
+    args = {'page': request.args.get('page', 1, type=int)}
+    for name in CURSOR_ARGS + ('per_page',):
+        value = request.args.get(name, type=int)
+        if value is not None: args[name] = value
+    if request.args.get('search'): args['search'] = request.args['search']
+    return args
+
+
+class KeysetPagination(Pagination):
+    """
+    Pagination untuk daftar yang diurutkan menurut id tanpa OFFSET besar: halaman berikut/sebelumnya
+    diambil dengan WHERE id > after / id < before lewat primary key, dan total diberikan dari luar
+    (mis. tabel stats) sehingga tidak ada COUNT(*) di setiap tampilan. Tanpa cursor (tautan lama
+    atau nomor halaman diketik langsung) kembali memakai OFFSET.
+    Antarmuka sama dengan Pagination Flask-SQLAlchemy; page_args(n) memberi argumen URL halaman n.
+    """
+
+    def _query_items(self):
+        query, id_column = self._query_args['query'], self._query_args['id_column']
+        after, before, skip = self._query_args.get('after'), self._query_args.get('before'), max(0, self._query_args.get('skip') or 0)
+        if self._query_args.get('last'):
+            # Halaman terakhir dibaca dari ujung akhir index id
+            remainder = self._query_args['total'] - (self.page - 1) * self.per_page
+            rows = query.order_by(id_column.desc()).limit(remainder if 0 < remainder <= self.per_page else self.per_page).all()
+            return rows[::-1]
+        if after is not None:
+            return query.filter(id_column > after).order_by(id_column.asc()).offset(skip).limit(self.per_page).all()
+        if before is not None:
+            rows = query.filter(id_column < before).order_by(id_column.desc()).offset(skip).limit(self.per_page).all()
+            return rows[::-1]
+        return query.order_by(id_column.asc()).offset(self._query_offset).limit(self.per_page).all()
+
+    def _query_count(self):
+        return self._query_args['total']
+
+    def page_args(self, page_num):
+        """Argumen URL (page dan cursor) untuk menuju halaman page_num dari halaman ini."""
+        if page_num is None or page_num == 1 or not self.items:
+            return {'page': page_num}
+        if page_num == self.page:
+            return {'page': page_num, **{name: self._query_args[name] for name in CURSOR_ARGS if self._query_args.get(name) is not None}}
+        key = self._query_args['id_column'].key
+        if page_num > self.page:
+            if page_num == self.pages and page_num - self.page > _MAX_SKIP_PAGES:
+                return {'page': page_num, 'last': 1}
+            args = {'page': page_num, 'after': getattr(self.items[-1], key)}
+            skip = (page_num - self.page - 1) * self.per_page
+        else:
+            args = {'page': page_num, 'before': getattr(self.items[0], key)}
+            skip = (self.page - page_num - 1) * self.per_page
+        if skip: args['skip'] = skip
+        return args
+
+
+class CachedCountPagination(QueryPagination):
+    """
+    Pagination OFFSET biasa (untuk hasil pencarian yang diurutkan menurut relevansi) dengan total
+    yang diingat per cache_key selama ttl detik, sehingga pindah halaman tidak menghitung ulang.
+    """
+
+    def _query_count(self):
+        key, ttl = self._query_args['cache_key'], self._query_args.get('ttl', 60)
+        cached = _count_cache.get(key)
+        if cached is not None and time.monotonic() - cached[1] < ttl:
+            return cached[0]
+        total = super()._query_count()
+        if len(_count_cache) >= _COUNT_CACHE_SIZE: _count_cache.clear()
+        _count_cache[key] = (total, time.monotonic())
+        return total
+
+    def page_args(self, page_num):
+        return {'page': page_num}
+
+
+def paginate_by_id(query, id_column, total, page, per_page):
+    """KeysetPagination untuk query (belum diurutkan) dengan posisi cursor dari request aktif."""
+    cursor = {name: request.args.get(name, type=int) for name in CURSOR_ARGS}
+    return KeysetPagination(query=query, id_column=id_column, total=total, page=page, per_page=per_page, error_out=False, **cursor)
+
+
+def paginate_cached(query, cache_key, page, per_page, ttl=60):
+    """CachedCountPagination untuk query yang sudah diurutkan (mis. hasil apply_search)."""
+    return CachedCountPagination(query=query, cache_key=cache_key, ttl=ttl, page=page, per_page=per_page, error_out=False)
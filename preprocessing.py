@@ -1,49 +1,424 @@
 # preprocessing.py
 
+import json
 import time
-from sqlalchemy import text
-from models import db, Preprocessing, Dataset
-from preprocessing_utils import full_preprocess_text
+from datetime import datetime
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from sqlalchemy import text, func, or_
+from models import db, Preprocessing, Dataset, Job, bulk_insert
+from jobs import fail_stale_jobs
+from labeling import label_key
+from stats import adjust_stats, reset_stats, label_change, get_stats
+from preprocessing_utils import full_preprocess_batch, fix_mojibake, cached_stem, profiler, warm_up, content_hash, dictionary_version
 
-def run_preprocessing_in_batches(app):
+
+_IN_WORKER = False
+# Ringkasan status untuk halaman preprocessing (lihat preprocessing_status), per proses
+_status_cache = {}
+
+
+def _init_worker(stem_cache_path=None, stem_cache_size=50000, profile=False):
+    """
+    Dijalankan sekali di setiap proses worker: memakai file cache stem yang sama dengan proses
+    utama dan memuatnya ke LRU worker. Stemmer hanya dibuat jika belum diwarisi dari proses induk.
+    """
+    global _IN_WORKER
+    _IN_WORKER = True
+    cached_stem.configure(stem_cache_path, stem_cache_size)
+    cached_stem.preload()
+    profiler.enabled = profile
+    profiler.reset()
+    warm_up()
+
+
+def _preprocess_chunk(texts):
+    results = full_preprocess_batch(texts)
+    # Kata baru dari worker langsung ditulis agar bisa dipakai proses lain
+    cached_stem.flush()
+    if not _IN_WORKER:
+        return results, None
+    # Penghitung worker dikirim ke proses utama lalu dikosongkan
+    stem_stats = cached_stem.stats()
+    cached_stem.reset_stats()
+    return results, {'stem_cache': stem_stats, 'profile': profiler.drain() if profiler.enabled else None}
+
+
+def _collect(chunk_outputs):
+    results = []
+    for chunk_results, worker_stats in chunk_outputs:
+        results.extend(chunk_results)
+        if worker_stats:
+            cached_stem.merge_stats(worker_stats['stem_cache'])
+            if worker_stats['profile']: profiler.merge(worker_stats['profile'])
+    return results
+
+
+@contextmanager
+def preprocessing_pool(workers):
+    """Process pool untuk preprocess_texts; None jika workers <= 1 (jalan serial)."""
+    if workers <= 1:
+        yield None
+        return
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                             initargs=(cached_stem.path, cached_stem.maxsize, profiler.enabled)) as executor:
+        yield executor
+
+
+def dedup_key(text):
+    """
+    Kunci dedup: hash teks mentah yang dinormalisasi. Spasi diseragamkan, dan teks ASCII
+    di-lowercase (hasil preprocessing tidak berubah karena keduanya dilakukan pipeline juga;
+    teks non-ASCII tidak di-lowercase karena perbaikan mojibake peka huruf besar/kecil).
+    """
+    normalized = ' '.join((text or '').split())
+    if normalized.isascii():
+        normalized = normalized.lower()
+    return content_hash(normalized)
+
+
+class DedupMemo:
+    """
+    Memo hasil preprocessing per dedup_key untuk satu kali proses, berupa LRU dengan batas maxsize
+    sehingga memori tetap konstan berapa pun jumlah baris. hits = baris yang tidak diproses ulang,
+    misses = teks yang benar-benar diproses.
+    """
+
+    def __init__(self, maxsize=50000):
+        self.maxsize = max(1, int(maxsize))
+        self.results = OrderedDict()
+        self.hits, self.misses = 0, 0
+
+    def get(self, key):
+        result = self.results.get(key)
+        if result is not None:
+            self.results.move_to_end(key)
+        return result
+
+    def put(self, key, result):
+        self.results[key] = result
+        if len(self.results) > self.maxsize:
+            self.results.popitem(last=False)
+
+
+def _run_preprocess(texts, workers, chunk_size, executor):
+    if len(texts) <= chunk_size or (executor is None and workers <= 1):
+        return _preprocess_chunk(texts)[0]
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    if executor is not None:
+        return _collect(executor.map(_preprocess_chunk, chunks))
+    with preprocessing_pool(min(workers, len(chunks))) as executor:
+        return _collect(executor.map(_preprocess_chunk, chunks))
+
+
+def preprocess_texts(texts, workers=1, chunk_size=500, executor=None, memo=None):
+    """
+    Menjalankan full_preprocess_batch untuk banyak teks.
+    Jika workers > 1 (atau executor diberikan), teks dibagi per potongan (chunk_size) ke
+    process pool; hasil dikembalikan dalam urutan input yang sama seperti versi serial.
+    Jika memo (DedupMemo) diberikan, setiap teks unik hanya diproses sekali; duplikatnya
+    (di batch ini maupun batch sebelumnya selama masih ada di LRU memo) diisi dari memo.
+    """
+    if memo is None:
+        return _run_preprocess(texts, workers, chunk_size, executor)
+    keys = [dedup_key(t) for t in texts]
+    # Hasil batch ini disimpan terpisah agar entri yang dibuang LRU di tengah batch tetap tersedia
+    results, pending = {}, {}
+    for key, t in zip(keys, texts):
+        if key in results or key in pending: continue
+        cached = memo.get(key)
+        if cached is not None:
+            results[key] = cached
+        else:
+            pending[key] = t
+    for key, result in zip(pending, _run_preprocess(list(pending.values()), workers, chunk_size, executor)):
+        results[key] = result
+        memo.put(key, result)
+    memo.hits += len(texts) - len(pending)
+    memo.misses += len(pending)
+    # Field 'original' tetap milik teks masing-masing
+    return [dict(results[key], original=t if t.isascii() else fix_mojibake(t)) for key, t in zip(keys, texts)]
+
+
+def _start_metrics(app):
+    """Mengosongkan penghitung cache stem & profiler di awal setiap run (PREPROCESSING_PROFILE mengaktifkan profiler)."""
+    if app.config.get('PREPROCESSING_PROFILE'):
+        profiler.enabled = True
+    profiler.reset()
+    cached_stem.reset_stats()
+
+
+def _report_metrics(summary):
+    """Mencetak statistik cache stem (termasuk worker) dan, jika aktif, waktu per langkah; disimpan di summary."""
+    cached_stem.flush()
+    stats = cached_stem.stats()
+    summary['stem_cache'] = stats
+    print(f"Cache stem: {stats['hits']} hit LRU, {stats['disk_hits']} hit disk, {stats['misses']} miss "
+          f"(hit rate {stats['hit_rate']:.1%}, {stats['size']}/{stats['maxsize']} entri di memori proses utama).")
+    if not profiler.enabled:
+        return
+    report = summary['profile'] = profiler.report()
+    print(f"Waktu per langkah untuk {report['texts']} teks (total {report['total_seconds']:.3f} dtk):")
+    for stage in report['stages']:
+        print(f"  {stage['step']:<16} {stage['seconds']:>9.4f} dtk {stage['share']:>7.1%} {stage['calls']:>10} panggilan {stage['avg_us']:>9.2f} us/panggilan")
+
+
+def iter_dataset_batches(batch_size, after_id=0, criteria=None):
+    """
+    Membaca Dataset per batch dengan keyset (id > id_terakhir ORDER BY id LIMIT n).
+    Hanya kolom yang diperlukan yang diambil dan tidak ada cursor yang terbuka di antara
+    batch, sehingga commit di tengah proses aman dan memori tetap konstan.
+    criteria: filter tambahan (mis. hanya baris yang berubah).
+    """
+    last_id = after_id
+    while True:
+        query = db.session.query(Dataset.id, Dataset.username, Dataset.text, Dataset.created_at, Dataset.text_hash)
+        if criteria is not None:
+            query = query.filter(criteria)
+        rows = query.filter(Dataset.id > last_id).order_by(Dataset.id.asc()).limit(batch_size).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def last_preprocessed_dataset_id():
+    """
+    Checkpoint: id Dataset terbesar yang sudah ditandai selesai (preprocessed_hash) dan di-commit,
+    termasuk baris yang hasil stemming-nya kosong sehingga tidak punya baris Preprocessing.
+    """
+    row = db.session.query(Dataset.id).filter(Dataset.preprocessed_hash.isnot(None)).order_by(Dataset.id.desc()).first()
+    return row.id if row else 0
+
+
+def refresh_text_hashes(batch_size):
+    """
+    Menghitung ulang content_hash(text) setiap baris Dataset dan memperbarui Dataset.text_hash yang
+    kosong atau tidak lagi cocok (teks diubah setelah diunggah, termasuk lewat SQL langsung),
+    sehingga _stale_criteria mendeteksi teks yang berubah. Mengembalikan jumlah baris yang diperbarui.
+    """
+    total = 0
+    for rows in iter_dataset_batches(batch_size):
+        changed = [{'id': row.id, 'text_hash': text_hash} for row in rows
+                   for text_hash in (content_hash(row.text),) if text_hash != row.text_hash]
+        if changed:
+            db.session.bulk_update_mappings(Dataset, changed)
+            db.session.commit()
+            total += len(changed)
+    return total
+
+
+def _stale_criteria(version):
+    """Baris Dataset yang baru, teksnya berubah, atau diproses dengan versi kamus lain."""
+    return or_(Dataset.preprocessed_hash.is_(None), Dataset.text_hash.is_(None), Dataset.preprocessed_hash != Dataset.text_hash,
+               Dataset.preprocessed_version.is_(None), Dataset.preprocessed_version != version)
+
+
+def count_pending_rows():
+    """Jumlah baris Dataset yang akan diproses oleh preprocessing inkremental."""
+    return db.session.query(func.count(Dataset.id)).filter(_stale_criteria(dictionary_version())).scalar() or 0
+
+
+def _interrupted_full_run(stale_seconds):
+    """Id job preprocessing penuh terakhir jika job itu gagal/terhenti (termasuk heartbeat yang usang), selain itu None."""
+    fail_stale_jobs(stale_seconds)
+    job = Job.query.filter(Job.kind == 'preprocessing').order_by(Job.created_at.desc()).first()
+    if job is None or job.status != 'failed' or json.loads(job.params or '{}').get('mode', 'full') != 'full':
+        return None
+    return job.id
+
+
+def preprocessing_status(ttl=60, stale_seconds=120):
+    """
+    pending (count_pending_rows) dan resume_available untuk halaman preprocessing. Resume hanya
+    ditawarkan jika job preprocessing penuh terakhir gagal atau terhenti (bukan sekadar ada data
+    mentah baru setelah checkpoint, mis. setelah unggah mode tambah) dan masih ada data setelah
+    checkpoint. Hasil diingat per proses selama ttl detik selama versi kamus, penghitung di tabel
+    stats, dan job terakhir tidak berubah, agar tidak ada scan tabel dataset di setiap tampilan.
+    """
+    stats = get_stats()
+    interrupted_job = _interrupted_full_run(stale_seconds)
+    key = (str(db.engine.url), dictionary_version(), stats['dataset_total'], stats['preprocessing_total'], interrupted_job)
+    cached = _status_cache.get('status')
+    if cached is not None and cached[0] == key and time.monotonic() - cached[1] < ttl:
+        return cached[2]
+    resume_available = False
+    if interrupted_job is not None:
+        last_done_id = last_preprocessed_dataset_id()
+        resume_available = bool(last_done_id) and last_done_id < (db.session.query(func.max(Dataset.id)).scalar() or 0)
+    status = {'pending': count_pending_rows(), 'resume_available': resume_available}
+    _status_cache['status'] = (key, time.monotonic(), status)
+    return status
+
+
+def invalidate_preprocessing_status():
+    """Dipanggil setelah data preprocessing/penanda Dataset berubah di proses ini."""
+    _status_cache.clear()
+
+
+def _processed_fields(row, processed_text):
+    return dict(
+        username=row.username,
+        text=row.text, # Simpan teks asli
+        text_clean=processed_text['cleaned'],
+        text_stopwords=processed_text['stopwords_removed'],
+        text_stem=processed_text['stemmed'],
+        created_at=row.created_at or datetime.now(), # Baris lama yang diunggah tanpa tanggal valid
+        dataset_id=row.id,
+        text_key=label_key(row.text)
+    )
+
+
+def _mark_processed(rows, version):
+    # Hash dihitung dari teks yang benar-benar diproses, bukan dari text_hash yang mungkin usang
+    db.session.bulk_update_mappings(Dataset, [
+        {'id': row.id, 'text_hash': text_hash, 'preprocessed_hash': text_hash, 'preprocessed_version': version}
+        for row in rows for text_hash in (content_hash(row.text),)
+    ])
+
+
+def run_preprocessing_in_batches(app, resume=False, progress=None):
     """
     Workflow utama preprocessing yang membawa serta label dari data mentah.
+    Mengembalikan ringkasan: processed (baris dibaca), inserted (baris disimpan), dan
+    deduplicated (baris duplikat yang hasilnya diambil dari memo, bukan diproses ulang),
+    stem_cache (statistik cached_stem, termasuk worker), dan profile (waktu per langkah 0-8,
+    hanya jika PREPROCESSING_PROFILE aktif).
+    progress(baris_selesai, total_baris) dipanggil setelah setiap batch (opsional).
+    Data dibaca, diproses, dan disimpan per batch (PREPROCESSING_BATCH_SIZE) dengan commit
+    di setiap batch. Jika resume=True, data lama tidak dihapus dan proses dilanjutkan dari
+    id Dataset terakhir yang sudah tersimpan (misalnya setelah proses sebelumnya terputus).
     """
     start_time = time.time()
     with app.app_context():
-        # Hapus data preprocessing lama
-        Preprocessing.query.delete()
-        if db.engine.name == 'mysql':
-            db.session.execute(text("ALTER TABLE preprocessing AUTO_INCREMENT = 1"))
-        db.session.commit()
+        _start_metrics(app)
+        batch_size = app.config.get('PREPROCESSING_BATCH_SIZE', 5000)
+        chunk_size = app.config.get('PREPROCESSING_CHUNK_SIZE', 500)
+        version = dictionary_version()
 
-        # Ambil semua data dari tabel Dataset
-        dataset_entries = Dataset.query.all()
-        if not dataset_entries:
-            print("Tidak ada data di tabel Dataset untuk diproses.")
-            return 0
-        
-        new_preprocessing_entries = []
-        for entry in dataset_entries:
-            processed_text = full_preprocess_text(entry.text)
-            
-            # Hanya simpan jika hasil stemming tidak kosong
-            if processed_text['stemmed']:
-                new_entry = Preprocessing(
-                    username=entry.username,
-                    text=entry.text, # Simpan teks asli
-                    text_clean=processed_text['cleaned'],
-                    text_stopwords=processed_text['stopwords_removed'],
-                    text_stem=processed_text['stemmed'],
-                    created_at=entry.created_at
-                    # Baris 'label=entry.label' sudah dihapus
-                )
-                new_preprocessing_entries.append(new_entry)
-        
-        if new_preprocessing_entries:
-            db.session.bulk_save_objects(new_preprocessing_entries)
+        if resume:
+            after_id = last_preprocessed_dataset_id()
+        else:
+            # Hapus data preprocessing lama
+            Preprocessing.query.delete()
+            reset_stats(preprocessing=True)
+            # Penanda selesai dikosongkan agar checkpoint resume mengikuti proses ini
+            Dataset.query.update({Dataset.preprocessed_hash: None, Dataset.preprocessed_version: None}, synchronize_session=False)
+            if db.engine.name == 'mysql':
+                db.session.execute(text("ALTER TABLE preprocessing AUTO_INCREMENT = 1"))
             db.session.commit()
-            
+            after_id = 0
+
+        total_inserted, total_read = 0, 0
+        total_rows = db.session.query(func.count(Dataset.id)).filter(Dataset.id > after_id).scalar() if progress else 0
+        memo = DedupMemo(app.config.get('PREPROCESSING_DEDUP_SIZE', 50000))
+        with preprocessing_pool(app.config.get('PREPROCESSING_WORKERS', 1)) as executor:
+            for rows in iter_dataset_batches(batch_size, after_id):
+                # Urutan hasil = urutan rows, baik serial maupun paralel
+                processed_texts = preprocess_texts([row.text for row in rows], chunk_size=chunk_size, executor=executor, memo=memo)
+                new_preprocessing_entries = [
+                    _processed_fields(row, processed_text)
+                    # Hanya simpan jika hasil stemming tidak kosong
+                    for row, processed_text in zip(rows, processed_texts) if processed_text['stemmed']
+                ]
+                if new_preprocessing_entries:
+                    bulk_insert(Preprocessing, new_preprocessing_entries)
+                    adjust_stats(preprocessing=len(new_preprocessing_entries))
+                _mark_processed(rows, version)
+                db.session.commit()
+                total_read += len(rows)
+                total_inserted += len(new_preprocessing_entries)
+                print(f"Preprocessing: {total_read} data dibaca, {total_inserted} disimpan (id terakhir {rows[-1].id}).")
+                if progress: progress(total_read, total_rows)
+
+        invalidate_preprocessing_status()
+        summary = {'processed': total_read, 'inserted': total_inserted, 'deduplicated': memo.hits}
+        if total_read == 0 and not resume:
+            print("Tidak ada data di tabel Dataset untuk diproses.")
+            return summary
+
         end_time = time.time()
-        print(f"Preprocessing selesai dalam {end_time - start_time:.2f} detik.")
-        return len(new_preprocessing_entries)
\ No newline at end of file
+        print(f"Preprocessing selesai dalam {end_time - start_time:.2f} detik. "
+              f"{memo.hits} dari {total_read} baris diambil dari cache dedup ({memo.misses} teks diproses).")
+        _report_metrics(summary)
+        return summary
+
+
+def run_incremental_preprocessing(app, progress=None):
+    """
+    Preprocessing inkremental: hanya baris Dataset yang baru, teksnya berubah, atau diproses
+    dengan versi kamus lama yang dikerjakan ulang. Baris yang tidak berubah (beserta labelnya)
+    tidak disentuh. Jika hanya versi kamus yang berubah, label tetap dipertahankan; jika
+    teksnya berubah, label dihapus karena sudah tidak sesuai.
+    Mengembalikan ringkasan jumlah baris per jenis perubahan. progress seperti pada
+    run_preprocessing_in_batches.
+    """
+    start_time = time.time()
+    summary = {'processed': 0, 'inserted': 0, 'updated': 0, 'deleted': 0, 'labels_reset': 0, 'deduplicated': 0, 'full_rebuild': False}
+    with app.app_context():
+        batch_size = app.config.get('PREPROCESSING_BATCH_SIZE', 5000)
+        chunk_size = app.config.get('PREPROCESSING_CHUNK_SIZE', 500)
+
+        # Hasil preprocessing lama tanpa dataset_id tidak bisa dipetakan ke Dataset: proses ulang penuh
+        if db.session.query(Preprocessing.id).filter(Preprocessing.dataset_id.is_(None)).first() is not None:
+            summary.update(run_preprocessing_in_batches(app, progress=progress), full_rebuild=True)
+            return summary
+
+        _start_metrics(app)
+        refresh_text_hashes(batch_size)
+        version = dictionary_version()
+
+        # Hasil preprocessing yang data mentahnya sudah tidak ada
+        orphaned = ~Preprocessing.dataset_id.in_(db.session.query(Dataset.id))
+        orphaned_labels = {label: -count for label, count in (db.session.query(Preprocessing.label, func.count(Preprocessing.id))
+                                                              .filter(orphaned, Preprocessing.label.isnot(None)).group_by(Preprocessing.label))}
+        deleted = Preprocessing.query.filter(orphaned).delete(synchronize_session=False)
+        adjust_stats(preprocessing=-deleted, labels=orphaned_labels)
+        summary['deleted'] += deleted
+        db.session.commit()
+
+        stale = _stale_criteria(version)
+        total_rows = count_pending_rows() if progress else 0
+        memo = DedupMemo(app.config.get('PREPROCESSING_DEDUP_SIZE', 50000))
+        with preprocessing_pool(app.config.get('PREPROCESSING_WORKERS', 1)) as executor:
+            for rows in iter_dataset_batches(batch_size, criteria=stale):
+                processed_texts = preprocess_texts([row.text for row in rows], chunk_size=chunk_size, executor=executor, memo=memo)
+                existing = {p.dataset_id: p for p in (db.session.query(Preprocessing.id, Preprocessing.dataset_id, Preprocessing.text, Preprocessing.label)
+                                                      .filter(Preprocessing.dataset_id.in_([row.id for row in rows])))}
+                inserts, updates, delete_ids = [], [], []
+                label_changes = Counter()
+                for row, processed_text in zip(rows, processed_texts):
+                    old = existing.get(row.id)
+                    if not processed_text['stemmed']:
+                        if old is not None:
+                            delete_ids.append(old.id)
+                            label_changes.update(label_change(old.label, None))
+                        continue
+                    fields = _processed_fields(row, processed_text)
+                    if old is None:
+                        inserts.append(fields)
+                        continue
+                    fields['id'] = old.id
+                    if old.text != row.text and old.label is not None:
+                        fields['label'] = None
+                        summary['labels_reset'] += 1
+                        label_changes.update(label_change(old.label, None))
+                    updates.append(fields)
+                if inserts: bulk_insert(Preprocessing, inserts)
+                if updates: db.session.bulk_update_mappings(Preprocessing, updates)
+                if delete_ids: Preprocessing.query.filter(Preprocessing.id.in_(delete_ids)).delete(synchronize_session=False)
+                adjust_stats(preprocessing=len(inserts) - len(delete_ids), labels=label_changes)
+                _mark_processed(rows, version)
+                db.session.commit()
+                summary['processed'] += len(rows)
+                summary['inserted'] += len(inserts)
+                summary['updated'] += len(updates)
+                summary['deleted'] += len(delete_ids)
+                if progress: progress(summary['processed'], total_rows)
+        invalidate_preprocessing_status()
+        summary['deduplicated'] = memo.hits
+
+        print(f"Preprocessing inkremental selesai dalam {time.time() - start_time:.2f} detik: {summary}")
+        _report_metrics(summary)
+        return summary
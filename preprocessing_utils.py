@@ -1,14 +1,53 @@
 # preprocessing_utils.py (Versi Final dengan Blacklist)
 
 import re
+import time
+import hashlib
+import threading
 from Sastrawi.StopWordRemover.StopWordRemoverFactory import StopWordRemoverFactory
-from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
 from functools import lru_cache
+from stem_cache import StemCache
 
-# Inisialisasi komponen Sastrawi
+_import_started = time.perf_counter()
+
+# Inisialisasi komponen Sastrawi. Daftar stopword murah dibuat; stemmer (kamus kata dasar
+# ~30 ribu kata) baru dibuat saat pertama kali dipakai atau saat warm_up() dipanggil.
 stopword_factory = StopWordRemoverFactory()
-stemmer_factory = StemmerFactory()
-stemmer = stemmer_factory.create_stemmer()
+_stemmer = None
+_stemmer_lock = threading.Lock()
+
+# Waktu inisialisasi (detik) untuk memantau biaya startup
+STARTUP_TIMINGS = {}
+
+
+def get_stemmer():
+    """Stemmer Sastrawi, dibuat sekali per proses saat pertama kali dibutuhkan."""
+    global _stemmer
+    if _stemmer is None:
+        with _stemmer_lock:
+            if _stemmer is None:
+                started = time.perf_counter()
+                from Sastrawi.Dictionary.ArrayDictionary import ArrayDictionary
+                from Sastrawi.Stemmer.Stemmer import Stemmer
+                from Sastrawi.Stemmer.StemmerFactory import StemmerFactory
+                # Tanpa CachedStemmer bawaan Sastrawi (cache tak terbatas): caching sudah ditangani cached_stem
+                _stemmer = Stemmer(ArrayDictionary(StemmerFactory().get_words()))
+                STARTUP_TIMINGS['stemmer_init'] = time.perf_counter() - started
+    return _stemmer
+
+
+def _stem_word(word):
+    return get_stemmer().stem(word)
+
+
+def warm_up():
+    """
+    Membuat stemmer sekarang juga. Panggil di proses master sebelum fork (mis. hook gunicorn
+    on_starting) agar semua worker berbagi halaman memori kamus secara copy-on-write dan
+    tidak membayar inisialisasi sendiri-sendiri. Mengembalikan salinan STARTUP_TIMINGS.
+    """
+    get_stemmer()
+    return dict(STARTUP_TIMINGS)
 
 # Daftar stopwords tambahan
 additional_stopwords = ['yg', 'yaa', 'dgn', 'klo', 'tuh', 'nya', 'sih', 'aja', 'ke', 'deh']
@@ -163,9 +202,30 @@ REGEX_PATTERNS = {
     'extra_spaces': re.compile(r'\s{2,}')
 }
 
-@lru_cache(maxsize=None)
-def cached_stem(word):
-    return stemmer.stem(word)
+# Naikkan jika logika full_preprocess_text berubah sehingga hasil lama harus diproses ulang
+PIPELINE_REVISION = 2
+
+def content_hash(text):
+    """Hash isi teks mentah (SHA-1 hex), dipakai untuk mendeteksi baris Dataset yang berubah."""
+    return hashlib.sha1((text or '').encode('utf-8')).hexdigest()
+
+@lru_cache(maxsize=1)
+def dictionary_version():
+    """
+    Versi kamus preprocessing: hash dari slang, blacklist, stopwords, dan PIPELINE_REVISION.
+    Berubah setiap kali salah satu kamus diubah, sehingga hasil lama dianggap usang.
+    """
+    digest = hashlib.sha1(f"rev={PIPELINE_REVISION}".encode('utf-8'))
+    for key, value in sorted(SLANG_WORDS.items()):
+        digest.update(f"s\x1f{key}\x1f{value}\x1e".encode('utf-8'))
+    for word in sorted(BLACKLISTED_WORDS):
+        digest.update(f"b\x1f{word}\x1e".encode('utf-8'))
+    for word in sorted(STOPWORDS_SET):
+        digest.update(f"w\x1f{word}\x1e".encode('utf-8'))
+    return digest.hexdigest()[:32]
+
+# Cache stemming terbatas (LRU) + kamus stem persisten; lokasi file diatur lewat cached_stem.configure()
+cached_stem = StemCache(_stem_word)
 
 
 # ===================================================================
@@ -181,53 +241,234 @@ def fix_mojibake(text):
         return text
 
 # ===================================================================
-# FUNGSI UTAMA DIPERBARUI
+# FUNGSI UTAMA: TOKENIZER SATU LINTASAN
+# ===================================================================
+# Token = deretan huruf a-z. Sama persis dengan mengganti karakter non-alfabet dengan spasi
+# lalu split(), tetapi cukup satu kali pindai.
+TOKEN_PATTERN = re.compile(r'[a-z]+')
+
+# ===================================================================
+# PENCOCOK FRASA SLANG & BLACKLIST
+# ===================================================================
+_PHRASE_END = object()
+
+
+class PhraseMatcher:
+    """
+    Kamus slang dan blacklist yang dikompilasi menjadi trie token, sehingga entri berisi
+    beberapa kata ('sok soan') maupun entri dengan spasi di tepinya (' safety', 'ckg ')
+    ikut cocok. Kunci dipecah dengan tokenizer yang sama dengan teks; kunci yang memuat
+    karakter selain huruf/spasi ('se7', 'w/') tidak mungkin muncul di aliran token dan diabaikan.
+
+    apply(tokens) melakukan blacklist + normalisasi slang dalam satu lintasan kiri ke kanan:
+    - token tunggal di blacklist selalu dibuang lebih dulu (sama seperti urutan lama), dan
+      dilewati saat mencocokkan frasa;
+    - pada setiap posisi dipilih frasa terpanjang; blacklist menang atas slang untuk kunci yang sama;
+    - token lain diganti dengan token hasil normalisasi slang (bisa kosong atau beberapa token).
+    """
+
+    def __init__(self, slang_words, blacklisted_words, version=None):
+        self.version = version
+        self.blacklist, self.single, self.trie = set(), {}, {}
+        self.unmatchable = []
+        # Urutan: kunci berspasi dulu, lalu kunci rapi, sehingga kunci rapi selalu menang atas
+        # varian berspasinya (mis. slang 'jalian' atas blacklist ' jalian'); pada tingkat yang sama
+        # blacklist diproses setelah slang sehingga blacklist yang menang.
+        entries = [(key, tuple(value.split())) for key, value in slang_words.items()]
+        entries += [(key, None) for key in sorted(blacklisted_words)]
+        for key, replacement in sorted(entries, key=lambda entry: entry[0] == ' '.join(entry[0].split())):
+            self._add(key, replacement)
+
+    def _add(self, key, replacement):
+        if not re.fullmatch(r'[a-z\s]*', key) or not key.split():
+            self.unmatchable.append(key)
+            return
+        tokens = key.split()
+        if len(tokens) == 1:
+            if replacement is None:
+                self.blacklist.add(tokens[0])
+                self.single.pop(tokens[0], None)
+            else:
+                self.blacklist.discard(tokens[0])
+                self.single[tokens[0]] = replacement
+            return
+        node = self.trie
+        for token in tokens:
+            node = node.setdefault(token, {})
+        node[_PHRASE_END] = replacement or ()
+
+    def apply(self, tokens):
+        blacklist, single, trie = self.blacklist, self.single, self.trie
+        out = []
+        i, n = 0, len(tokens)
+        while i < n:
+            token = tokens[i]
+            i += 1
+            if token in blacklist: continue
+            node = trie.get(token)
+            if node is not None:
+                # Cari frasa terpanjang yang dimulai dari token ini
+                match, match_end, j = None, i, i
+                while j < n:
+                    next_token = tokens[j]
+                    j += 1
+                    if next_token in blacklist: continue
+                    node = node.get(next_token)
+                    if node is None: break
+                    if _PHRASE_END in node: match, match_end = node[_PHRASE_END], j
+                if match is not None:
+                    out += match
+                    i = match_end
+                    continue
+            replacement = single.get(token)
+            if replacement is None: out.append(token)
+            else: out += replacement
+        return out
+
+
+_phrase_matcher = None
+
+
+def get_phrase_matcher():
+    """Matcher hasil kompilasi kamus; dikompilasi ulang hanya jika dictionary_version() berubah."""
+    global _phrase_matcher
+    version = dictionary_version()
+    if _phrase_matcher is None or _phrase_matcher.version != version:
+        _phrase_matcher = PhraseMatcher(SLANG_WORDS, BLACKLISTED_WORDS, version)
+    return _phrase_matcher
+
+
+def refresh_dictionaries():
+    """Panggil setelah SLANG_WORDS/BLACKLISTED_WORDS/STOPWORDS_SET diubah saat runtime."""
+    dictionary_version.cache_clear()
+    return get_phrase_matcher()
+
+
+# ===================================================================
+# INSTRUMENTASI PER LANGKAH (OPSIONAL)
 # ===================================================================
+class PipelineProfiler:
+    """
+    Waktu kumulatif dan jumlah panggilan per langkah 0-8 pipeline preprocessing.
+    Nonaktif secara default: full_preprocess_batch memeriksa flag 'enabled' sekali per batch dan
+    memakai penanda langkah kosong (_no_step), sehingga jalur normal tidak membaca jam sama sekali.
+    Langkah 4 (blacklist) dan 5 (slang) dikerjakan PhraseMatcher dalam satu lintasan sehingga diukur bersama.
+    """
+    STEPS = ('0_mojibake', '1_case_folding', '2_link_mention', '3_tokenize', '4_5_blacklist_slang',
+             '6_spaces', '7_stopwords', '8_stemming')
+
+    def __init__(self):
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.seconds = dict.fromkeys(self.STEPS, 0.0)
+        self.calls = dict.fromkeys(self.STEPS, 0)
+        self.texts = 0
+
+    def drain(self):
+        """Mengambil lalu mengosongkan penghitung (dipakai worker untuk mengirim ke proses utama)."""
+        snapshot = {'seconds': self.seconds, 'calls': self.calls, 'texts': self.texts}
+        self.reset()
+        return snapshot
+
+    def merge(self, snapshot):
+        for step in self.STEPS:
+            self.seconds[step] += snapshot['seconds'][step]
+            self.calls[step] += snapshot['calls'][step]
+        self.texts += snapshot['texts']
+
+    def step_clock(self, clock=time.perf_counter):
+        """
+        Penanda langkah untuk satu batch: step() memulai pengukuran, step(nama) menambahkan waktu
+        sejak penanda sebelumnya ke langkah tersebut.
+        """
+        seconds, calls, last = self.seconds, self.calls, [clock()]
+
+        def step(name=None):
+            now = clock()
+            if name is not None:
+                seconds[name] += now - last[0]
+                calls[name] += 1
+            last[0] = now
+        return step
+
+    def report(self):
+        """Ringkasan per langkah (detik, panggilan, rata-rata, porsi) beserta statistik cached_stem."""
+        total = sum(self.seconds.values())
+        stages = [{'step': step, 'seconds': self.seconds[step], 'calls': self.calls[step],
+                   'avg_us': self.seconds[step] / self.calls[step] * 1e6 if self.calls[step] else 0.0,
+                   'share': self.seconds[step] / total if total else 0.0} for step in self.STEPS]
+        return {'enabled': self.enabled, 'texts': self.texts, 'total_seconds': total, 'stages': stages,
+                'stem_cache': cached_stem.stats()}
+
+
+profiler = PipelineProfiler()
+
+def _no_step(name=None):
+    pass
+
+
+def full_preprocess_batch(texts):
+    """
+    Memproses banyak teks sekaligus dari awal hingga akhir.
+    Setiap teks dipindai sekali oleh tokenizer, lalu aliran token melewati blacklist dan
+    normalisasi slang (termasuk frasa multi-kata) dalam satu lintasan, kemudian stopword
+    removal dan stemming. Token yang berulang di dalam batch hanya di-stem sekali.
+    Jika profiler aktif, waktu setiap langkah 0-8 dicatat lewat profiler.step_clock().
+    Mengembalikan list dict dengan field yang sama seperti full_preprocess_text.
+    """
+    step = profiler.step_clock() if profiler.enabled else _no_step
+    matcher = get_phrase_matcher()
+    stem_memo = {}
+    results = []
+    for text in texts:
+        step()
+        # Teks ASCII tidak mungkin mojibake
+        if not text.isascii():
+            text = fix_mojibake(text)
+        step('0_mojibake')
+        text_lower = text.lower()
+        step('1_case_folding')
+        # Regex link/mention hanya dijalankan jika teks memang mengandung penandanya
+        if 'http' in text_lower:
+            text_lower = REGEX_PATTERNS['links'].sub('', text_lower)
+        if '@' in text_lower or '#' in text_lower:
+            text_lower = REGEX_PATTERNS['mentions_hashtags'].sub('', text_lower)
+        step('2_link_mention')
+        words = TOKEN_PATTERN.findall(text_lower)
+        step('3_tokenize')
+        cleaned = matcher.apply(words)
+        step('4_5_blacklist_slang')
+        cleaned_text = " ".join(cleaned)
+        step('6_spaces')
+        kept = [token for token in cleaned if token not in STOPWORDS_SET]
+        kept_text = " ".join(kept)
+        step('7_stopwords')
+        stemmed = []
+        for token in kept:
+            stem = stem_memo.get(token)
+            if stem is None:
+                stem = stem_memo[token] = cached_stem(token)
+            stemmed.append(stem)
+        stemmed_text = " ".join(stemmed)
+        step('8_stemming')
+        results.append({
+            "original": text, # Akan berisi teks yang sudah diperbaiki encodingnya
+            "cleaned": cleaned_text,
+            "stopwords_removed": kept_text,
+            "stemmed": stemmed_text
+        })
+    if step is not _no_step:
+        profiler.texts += len(texts)
+    return results
+
+
 def full_preprocess_text(text):
     """
     Fungsi terpusat untuk memproses satu buah teks dari awal hingga akhir.
     """
-    # --- LANGKAH 0: PERBAIKAN ENCODING (MOJIBAKE) ---
-    # Langkah ini ditambahkan di paling awal untuk memperbaiki teks "rusak"
-    text = fix_mojibake(text)
-    # ---------------------------------------------
-    
-    # 1. Case Folding
-    text_lower = text.lower()
-    
-    # 2. Hapus Link, Mention, Hashtag
-    text_no_links = REGEX_PATTERNS['links'].sub('', text_lower)
-    text_no_mentions = REGEX_PATTERNS['mentions_hashtags'].sub('', text_no_links)
-    
-    # 3. Hapus Karakter Non-Alfabetik
-    text_alpha = REGEX_PATTERNS['non_alpha_numeric'].sub(' ', text_no_mentions)
-    
-    # --- Tokenizing terjadi di sini secara implisit ---
-    words = text_alpha.split()
-    
-    # 4. Hapus Kata dari Blacklist
-    words = [word for word in words if word not in BLACKLISTED_WORDS]
-    
-    # 5. Normalisasi Kata Slang
-    normalized_words = [SLANG_WORDS.get(word, word) for word in words]
-    
-    # 6. Hapus Spasi Berlebih
-    text_cleaned = REGEX_PATTERNS['extra_spaces'].sub(' ', " ".join(normalized_words)).strip()
-    
-    # 7. Stopword Removal
-    tokens = text_cleaned.split()
-    text_stopwords_removed = " ".join([word for word in tokens if word not in STOPWORDS_SET])
-    
-    # 8. Stemming
-    if text_stopwords_removed:
-        stemmed_words = [cached_stem(word) for word in text_stopwords_removed.split()]
-        text_stemmed = " ".join(stemmed_words)
-    else:
-        text_stemmed = ""
-
-    return {
-        "original": text, # Akan berisi teks yang sudah diperbaiki encodingnya
-        "cleaned": text_cleaned,
-        "stopwords_removed": text_stopwords_removed,
-        "stemmed": text_stemmed
-    }
\ No newline at end of file
+    return full_preprocess_batch([text])[0]
+
+
+STARTUP_TIMINGS['module_import'] = time.perf_counter() - _import_started
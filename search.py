@@ -0,0 +1,124 @@
+# search.py
+
+from sqlalchemy import inspect, text, table, column, select, literal_column, or_
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.dialects.mysql import match
+from models import db, Dataset, Preprocessing
+
+# Kolom yang dicari per model (sama dengan kotak pencarian di halaman data)
+SEARCH_COLUMNS = {
+    Dataset: ('username', 'text'),
+    Preprocessing: ('username', 'text_stem'),
+}
+# Panjang kata minimum yang bisa dicari lewat index (trigram FTS5 / ngram MySQL); lebih pendek memakai ILIKE
+MIN_TERM_LENGTH = {'sqlite': 3, 'mysql': 2}
+
+# Status index per engine (url -> bool), diperiksa sekali per proses
+_available = {}
+
+
+def _fts_name(model):
+    return f'{model.__tablename__}_fts'
+
+
+def _fulltext_name(model):
+    return f'ft_{model.__tablename__}_search'
+
+
+def _create_sqlite_index(model):
+    """
+    Tabel FTS5 external-content (tokenizer trigram: pencocokan substring seperti ILIKE '%kata%')
+    yang disinkronkan dengan trigger pada setiap INSERT/UPDATE/DELETE tabel aslinya.
+    """
+    name, source, cols = _fts_name(model), model.__tablename__, SEARCH_COLUMNS[model]
+    col_list = ', '.join(cols)
+    new_values, old_values = ', '.join(f'new.{c}' for c in cols), ', '.join(f'old.{c}' for c in cols)
+    statements = [
+        f"CREATE VIRTUAL TABLE {name} USING fts5({col_list}, content='{source}', content_rowid='id', tokenize='trigram')",
+        f"CREATE TRIGGER {name}_ai AFTER INSERT ON {source} BEGIN "
+        f"INSERT INTO {name}(rowid, {col_list}) VALUES (new.id, {new_values}); END",
+        f"CREATE TRIGGER {name}_ad AFTER DELETE ON {source} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {col_list}) VALUES ('delete', old.id, {old_values}); END",
+        f"CREATE TRIGGER {name}_au AFTER UPDATE OF {col_list} ON {source} BEGIN "
+        f"INSERT INTO {name}({name}, rowid, {col_list}) VALUES ('delete', old.id, {old_values}); "
+        f"INSERT INTO {name}(rowid, {col_list}) VALUES (new.id, {new_values}); END",
+        f"INSERT INTO {name}({name}) VALUES ('rebuild')",
+    ]
+    for statement in statements:
+        db.session.execute(text(statement))
+
+
+def ensure_search_index():
+    """
+    Membuat index full-text untuk tabel dataset dan preprocessing jika belum ada: FTS5 di SQLite,
+    FULLTEXT (parser ngram) di MySQL. Aman dipanggil berulang kali. Mengembalikan True jika
+    index tersedia; jika tidak (engine lain atau FTS5 tidak didukung), pencarian memakai ILIKE.
+    """
+    engine = db.engine
+    _available.pop(str(engine.url), None)
+    inspector = inspect(engine)
+    try:
+        for model in SEARCH_COLUMNS:
+            if not inspector.has_table(model.__tablename__): return False
+            if engine.name == 'sqlite' and not inspector.has_table(_fts_name(model)):
+                _create_sqlite_index(model)
+            elif engine.name == 'mysql' and _fulltext_name(model) not in {idx['name'] for idx in inspector.get_indexes(model.__tablename__)}:
+                db.session.execute(text(f"ALTER TABLE {model.__tablename__} ADD FULLTEXT INDEX {_fulltext_name(model)} "
+                                        f"({', '.join(SEARCH_COLUMNS[model])}) WITH PARSER ngram"))
+            elif engine.name not in MIN_TERM_LENGTH:
+                return False
+        db.session.commit()
+    except DBAPIError:
+        db.session.rollback()
+        return False
+    return True
+
+
+def rebuild_search_index():
+    """Membangun ulang isi index FTS5 dari tabel asli (MySQL menjaga FULLTEXT sendiri)."""
+    ensure_search_index()
+    if db.engine.name == 'sqlite' and search_available():
+        for model in SEARCH_COLUMNS:
+            db.session.execute(text(f"INSERT INTO {_fts_name(model)}({_fts_name(model)}) VALUES ('rebuild')"))
+        db.session.commit()
+
+
+def search_available():
+    """True jika index full-text untuk engine aktif sudah ada (hasil diingat per proses)."""
+    engine = db.engine
+    key = str(engine.url)
+    if key not in _available:
+        if engine.name == 'sqlite':
+            _available[key] = all(inspect(engine).has_table(_fts_name(model)) for model in SEARCH_COLUMNS)
+        elif engine.name == 'mysql':
+            names = [{idx['name'] for idx in inspect(engine).get_indexes(model.__tablename__)} for model in SEARCH_COLUMNS]
+            _available[key] = all(_fulltext_name(model) in existing for model, existing in zip(SEARCH_COLUMNS, names))
+        else:
+            _available[key] = False
+    return _available[key]
+
+
+def _like_search(query, model, term):
+    pattern = f'%{term}%'
+    return query.filter(or_(*(getattr(model, col).ilike(pattern) for col in SEARCH_COLUMNS[model]))).order_by(model.id.asc())
+
+
+def apply_search(query, model, term):
+    """
+    Menyaring query Dataset/Preprocessing dengan kata pencarian (substring di kolom SEARCH_COLUMNS,
+    tanpa membedakan huruf besar/kecil) dan mengurutkan hasil berdasarkan relevansi, lalu id.
+    Memakai index full-text jika tersedia; kata yang terlalu pendek atau engine tanpa index memakai ILIKE.
+    """
+    engine = db.engine
+    if len(term) < MIN_TERM_LENGTH.get(engine.name, 0) or not search_available():
+        return _like_search(query, model, term)
+    if engine.name == 'sqlite':
+        # Kata dicari sebagai frasa: tanda kutip ganda di dalamnya di-escape sesuai sintaks FTS5
+        fts = table(_fts_name(model), column('rowid'), column('rank'))
+        hits = (select(fts.c.rowid, fts.c.rank)
+                .where(literal_column(_fts_name(model)).op('MATCH')('"' + term.replace('"', '""') + '"'))
+                .subquery())
+        return query.join(hits, hits.c.rowid == model.id).order_by(hits.c.rank.asc(), model.id.asc())
+    # MySQL BOOLEAN MODE: frasa dalam tanda kutip ganda (tanda kutip di dalam kata dibuang)
+    score = match(*(getattr(model, col) for col in SEARCH_COLUMNS[model]), against='"' + term.replace('"', ' ') + '"').in_boolean_mode()
+    return query.filter(score > 0).order_by(score.desc(), model.id.asc())
@@ -0,0 +1,79 @@
+# stats.py
+
+from collections import Counter
+from datetime import datetime
+from sqlalchemy import func
+from models import db, Dataset, Preprocessing, Stats
+
+STATS_ID = 1
+# Label yang dihitung -> kolom penghitung di tabel stats
+LABEL_COLUMNS = {'positif': 'label_positif', 'negatif': 'label_negatif', 'netral': 'label_netral'}
+
+
+def label_change(old_label, new_label):
+    """Selisih penghitung label saat satu baris berubah dari old_label ke new_label."""
+    change = Counter()
+    if old_label != new_label:
+        if old_label: change[old_label] -= 1
+        if new_label: change[new_label] += 1
+    return change
+
+
+def rebuild_stats():
+    """
+    Menghitung ulang seluruh penghitung dari tabel dataset dan preprocessing (dalam transaksi
+    yang sedang berjalan, tanpa commit). Dipakai jika baris stats belum ada atau untuk
+    memperbaiki penghitung yang tidak sinkron (perintah 'flask rebuild-stats').
+    """
+    values = {column: 0 for column in LABEL_COLUMNS.values()}
+    for label, count in (db.session.query(Preprocessing.label, func.count(Preprocessing.id))
+                         .filter(Preprocessing.label.in_(LABEL_COLUMNS)).group_by(Preprocessing.label)):
+        values[LABEL_COLUMNS[label]] = count
+    values['dataset_total'] = db.session.query(func.count(Dataset.id)).scalar() or 0
+    values['preprocessing_total'] = db.session.query(func.count(Preprocessing.id)).scalar() or 0
+    values['updated_at'] = datetime.now()
+    table = Stats.__table__
+    if db.session.execute(table.update().where(table.c.id == STATS_ID).values(**values)).rowcount == 0:
+        db.session.execute(table.insert().values(id=STATS_ID, **values))
+    return values
+
+
+def adjust_stats(dataset=0, preprocessing=0, labels=None):
+    """
+    Menambah penghitung sebesar delta (boleh negatif) dengan satu UPDATE col = col + delta.
+    Dipanggil sebelum commit perubahan datanya agar penghitung ikut transaksi yang sama.
+    labels: dict/Counter label -> delta (mis. dari label_change()).
+    """
+    table = Stats.__table__
+    deltas = {'dataset_total': dataset, 'preprocessing_total': preprocessing}
+    for label, delta in (labels or {}).items():
+        if label in LABEL_COLUMNS: deltas[LABEL_COLUMNS[label]] = delta
+    values = {column: table.c[column] + delta for column, delta in deltas.items() if delta}
+    if not values: return
+    if db.session.execute(table.update().where(table.c.id == STATS_ID).values(updated_at=datetime.now(), **values)).rowcount == 0:
+        # Belum ada baris stats: hitung langsung dari tabel (sudah termasuk perubahan ini)
+        rebuild_stats()
+
+
+def reset_stats(dataset=False, preprocessing=True):
+    """Mengosongkan penghitung setelah tabel dihapus seluruhnya (preprocessing termasuk label)."""
+    values = {'updated_at': datetime.now()}
+    if dataset: values['dataset_total'] = 0
+    if preprocessing:
+        values['preprocessing_total'] = 0
+        values.update({column: 0 for column in LABEL_COLUMNS.values()})
+    table = Stats.__table__
+    if db.session.execute(table.update().where(table.c.id == STATS_ID).values(**values)).rowcount == 0:
+        rebuild_stats()
+
+
+def get_stats():
+    """Penghitung terkini sebagai dict (satu baris dibaca); baris dibuat dari tabel jika belum ada."""
+    row = db.session.get(Stats, STATS_ID)
+    if row is None:
+        rebuild_stats()
+        db.session.commit()
+        row = db.session.get(Stats, STATS_ID)
+    counts = {label: getattr(row, column) for label, column in LABEL_COLUMNS.items()}
+    return {'dataset_total': row.dataset_total, 'preprocessing_total': row.preprocessing_total,
+            'labeled_total': sum(counts.values()), **counts}
@@ -0,0 +1,121 @@
+# stem_cache.py
+
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+
+class StemCache:
+    """
+    Cache hasil stemming dua lapis:
+    1. LRU di memori dengan batas maxsize (tidak tumbuh tanpa batas di worker yang berumur panjang).
+    2. Kamus stem persisten di file SQLite (opsional, path=None berarti hanya memori). File ini
+       dibaca oleh semua proses (web, worker preprocessing, worker gunicorn), dimuat di awal
+       dengan preload(), dan ditambah dengan kata baru secara berkala lewat flush().
+    Objek dipanggil seperti fungsi: cache(word) -> stem.
+    """
+
+    def __init__(self, stem_func, path=None, maxsize=50000, flush_every=500):
+        self._stem_func = stem_func
+        self._lock = threading.RLock()
+        self._lru = OrderedDict()
+        self._pending = {}
+        self._conn, self._conn_pid = None, None
+        self.flush_every = flush_every
+        self.configure(path, maxsize)
+
+    def configure(self, path=None, maxsize=50000):
+        """Mengatur file persisten dan batas LRU (dipanggil saat startup aplikasi atau worker)."""
+        with self._lock:
+            if self._pending: self.flush()
+            self._close()
+            self.path, self.maxsize = path, max(1, int(maxsize))
+            self._lru.clear()
+            self.reset_stats()
+        return self
+
+    def _connection(self):
+        # Koneksi SQLite tidak boleh dipakai lintas fork: buat ulang per proses
+        if self.path is None: return None
+        if self._conn is None or self._conn_pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS stems (word TEXT PRIMARY KEY, stem TEXT NOT NULL)")
+            self._conn_pid = os.getpid()
+        return self._conn
+
+    def _close(self):
+        if self._conn is not None and self._conn_pid == os.getpid():
+            self._conn.close()
+        self._conn, self._conn_pid = None, None
+
+    def _remember(self, word, stem):
+        self._lru[word] = stem
+        if len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def preload(self):
+        """Memuat hingga maxsize entri dari file persisten ke LRU. Mengembalikan jumlah entri."""
+        with self._lock:
+            conn = self._connection()
+            if conn is None: return 0
+            rows = conn.execute("SELECT word, stem FROM stems ORDER BY rowid DESC LIMIT ?", (self.maxsize,)).fetchall()
+            for word, stem in reversed(rows):
+                self._remember(word, stem)
+            return len(rows)
+
+    def __call__(self, word):
+        with self._lock:
+            stem = self._lru.get(word)
+            if stem is not None:
+                self._lru.move_to_end(word)
+                self.hits += 1
+                return stem
+            stem = self._pending.get(word)
+            conn = self._connection()
+            if stem is None and conn is not None:
+                row = conn.execute("SELECT stem FROM stems WHERE word = ?", (word,)).fetchone()
+                stem = row[0] if row else None
+            if stem is not None:
+                self.disk_hits += 1
+            else:
+                stem = self._stem_func(word)
+                self.misses += 1
+                if conn is not None:
+                    self._pending[word] = stem
+                    if len(self._pending) >= self.flush_every: self.flush()
+            self._remember(word, stem)
+            return stem
+
+    def flush(self):
+        """Menulis kata baru yang belum tersimpan ke file persisten. Mengembalikan jumlah kata."""
+        with self._lock:
+            conn = self._connection()
+            if conn is None or not self._pending: return 0
+            pending, self._pending = list(self._pending.items()), {}
+            with conn:
+                conn.executemany("INSERT OR IGNORE INTO stems (word, stem) VALUES (?, ?)", pending)
+            return len(pending)
+
+    def reset_stats(self):
+        self.hits = self.disk_hits = self.misses = 0
+
+    def merge_stats(self, stats):
+        """Menambahkan penghitung dari proses lain (mis. worker preprocessing) ke penghitung ini."""
+        self.hits += stats['hits']
+        self.disk_hits += stats['disk_hits']
+        self.misses += stats['misses']
+
+    def stats(self):
+        """Statistik cache: hits (LRU), disk_hits (file persisten), misses (stemming ulang)."""
+        lookups = self.hits + self.disk_hits + self.misses
+        return {'hits': self.hits, 'disk_hits': self.disk_hits, 'misses': self.misses, 'size': len(self._lru),
+                'maxsize': self.maxsize, 'hit_rate': (self.hits + self.disk_hits) / lookups if lookups else 0.0}
+
+    def cache_clear(self):
+        """Mengosongkan LRU dan statistik (file persisten tidak dihapus)."""
+        with self._lock:
+            self._lru.clear()
+            self.reset_stats()
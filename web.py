@@ -1,16 +1,16 @@
 # web.py
 
-from flask import Flask, render_template, request, flash, redirect, url_for, session
+from flask import Flask, render_template, request, flash, redirect, url_for, session, jsonify, abort
 import os
+import atexit
 from werkzeug.utils import secure_filename
 from datetime import datetime
-import pandas as pd
 import sqlalchemy
-from sqlalchemy import or_, func, text
+from sqlalchemy import text
 import statistics
 
 from config import config
-from models import db, Dataset, Preprocessing
+from models import db, Dataset, Preprocessing, upgrade_schema
 from forms import (
     UploadCSVForm, 
     FilterDataForm, 
@@ -21,15 +21,23 @@ from forms import (
     ClassificationForm,
     PredictForm
 )
-from preprocessing_utils import full_preprocess_text
-from preprocessing import run_preprocessing_in_batches
+from preprocessing_utils import full_preprocess_batch, cached_stem, warm_up, profiler, STARTUP_TIMINGS
+from preprocessing import run_preprocessing_in_batches, run_incremental_preprocessing, preprocessing_status, invalidate_preprocessing_status
+from model_registry import get_model, invalidate_model, update_model
+from ingestion import ingest_upload
+from labeling import apply_labels
+from search import apply_search, ensure_search_index, rebuild_search_index, search_available
+from pagination import paginate_by_id, paginate_cached, list_args_from_request
+from stats import get_stats, adjust_stats, reset_stats, rebuild_stats, label_change
+from jobs import register_job, submit_job, job_status, job_result, recover_interrupted_jobs
 from classification_utils import (
     TFIDFVectorizer,
     KNeighborsClassifier,
     train_test_split,
     calculate_metrics,
     run_kfold_cross_validation,
-    
+    ann_agreement_report,
+    knn_options_from_config
 )
 from visualization_utils import generate_bar_chart_image, generate_pie_chart_image, generate_wordclouds
 
@@ -43,6 +51,13 @@ if not app.config['SECRET_KEY']:
     raise ValueError("SECRET_KEY tidak diatur! Diperlukan untuk menggunakan session.")
 db.init_app(app)
 
+# Cache stem persisten: dimuat sekali saat startup, kata baru ditulis kembali saat proses berhenti
+cached_stem.configure(app.config.get('STEM_CACHE_PATH'), app.config.get('STEM_CACHE_SIZE', 50000))
+cached_stem.preload()
+atexit.register(cached_stem.flush)
+if app.config.get('SASTRAWI_WARMUP'):
+    warm_up()
+
 def clear_results_session():
     """Menghapus semua hasil dari session agar selalu fresh."""
     session.pop('detailed_results', None)
@@ -53,27 +68,17 @@ def clear_results_session():
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in app.config['ALLOWED_EXTENSIONS']
 
-def clean_text(text_data):
-    if pd.isna(text_data): return ""
-    return str(text_data).strip() 
-
 @app.route('/')
 def index():
     try:
-        total_dataset_mentah = db.session.query(func.count(Dataset.id)).scalar()
-        total_setelah_preprocessing = db.session.query(func.count(Preprocessing.id)).scalar()
-        total_berlabel = db.session.query(func.count(Preprocessing.id)).filter(Preprocessing.label.isnot(None)).scalar()
-        label_counts = db.session.query(Preprocessing.label, func.count(Preprocessing.label)).filter(Preprocessing.label.isnot(None)).group_by(Preprocessing.label).all()
-        counts = { 'positif': 0, 'negatif': 0, 'netral': 0 }
-        for label, count in label_counts:
-            if label in counts: counts[label] = count
+        # Satu baris dari tabel stats (dijaga bersama setiap perubahan data), bukan COUNT per tabel
+        counts = get_stats()
     except Exception as e:
         app.logger.error(f"Error fetching dashboard stats: {e}")
-        total_dataset_mentah, total_setelah_preprocessing, total_berlabel = 0, 0, 0
-        counts = {'positif': 0, 'negatif': 0, 'netral': 0}
+        counts = {'dataset_total': 0, 'preprocessing_total': 0, 'labeled_total': 0, 'positif': 0, 'negatif': 0, 'netral': 0}
     stats = {
-        'total_dataset': total_dataset_mentah, 'total_preprocessing': total_setelah_preprocessing,
-        'total_berlabel': total_berlabel, 'label_positif': counts['positif'],
+        'total_dataset': counts['dataset_total'], 'total_preprocessing': counts['preprocessing_total'],
+        'total_berlabel': counts['labeled_total'], 'label_positif': counts['positif'],
         'label_negatif': counts['negatif'], 'label_netral': counts['netral']
     }
     return render_template('index.html', title="Dashboard", stats=stats)
@@ -94,26 +99,26 @@ def input_data():
         filepath = os.path.join(upload_folder, filename)
         file.save(filepath)
         try:
-            file_extension = filename.rsplit('.', 1)[1].lower()
-            df = pd.read_excel(filepath).fillna('') if file_extension in ['xls', 'xlsx'] else pd.read_csv(filepath, encoding='utf-8').fillna('')
-            Dataset.query.delete()
-            Preprocessing.query.delete()
-            db.session.commit() # Commit delete before resetting auto-increment
-            if db.engine.name == 'mysql':
-                db.session.execute(text("ALTER TABLE dataset AUTO_INCREMENT = 1"))
-                db.session.execute(text("ALTER TABLE preprocessing AUTO_INCREMENT = 1"))
-            db.session.commit()
-            required_columns = {'username', 'text', 'created_at'}
-            df.columns = [col.lower() for col in df.columns]
-            if not required_columns.issubset(df.columns):
-                missing_cols = required_columns - set(df.columns)
-                flash(f'Kolom pada file Excel/CSV hilang: {", ".join(missing_cols)}.', 'error')
+            # Mode tambah: data lama dipertahankan sehingga preprocessing inkremental cukup memproses baris baru
+            append = upload_form.append.data
+            def clear_existing_data():
+                # Tanpa commit: penghapusan ikut transaksi impor dan dibatalkan jika impor gagal.
+                # (AUTO_INCREMENT MySQL tidak direset di sini karena ALTER TABLE melakukan commit implisit.)
+                Dataset.query.delete()
+                Preprocessing.query.delete()
+                reset_stats(dataset=True, preprocessing=True)
+            try:
+                summary = ingest_upload(filepath, chunk_size=app.config.get('UPLOAD_CHUNK_SIZE', 10000), before_insert=None if append else clear_existing_data)
+            except ValueError as e:
+                # File kosong atau header tidak valid: data lama belum disentuh
+                flash(str(e), 'error')
                 return redirect(url_for('input_data'))
-            new_dataset_entries = [Dataset(username=str(row['username']), text=clean_text(row['text']), created_at=pd.to_datetime(row['created_at'], errors='coerce').to_pydatetime()) for _, row in df.iterrows()]
-            if new_dataset_entries:
-                db.session.add_all(new_dataset_entries)
-                db.session.commit()
-            flash(f'{len(new_dataset_entries)} data mentah berhasil diunggah.', 'success')
+            if not append:
+                invalidate_model(app)
+            flash(f'{summary["inserted"]} data mentah berhasil {"ditambahkan" if append else "diunggah"} '
+                  f'({summary["rows_per_sec"]:.0f} baris/detik).', 'success')
+            if summary['rejected']:
+                flash(f'{summary["rejected"]} baris ditolak karena rusak, contoh: {"; ".join(summary["rejected_samples"][:5])}.', 'warning')
         except Exception as e:
             db.session.rollback()
             flash(f'Terjadi kesalahan saat memproses file: {str(e)}', 'error')
@@ -122,11 +127,11 @@ def input_data():
     
     page, per_page, search_query = request.args.get('page', 1, type=int), request.args.get('per_page', 10, type=int), request.args.get('search', '')
     filter_form.per_page.data, filter_form.search.data = per_page, search_query
-    query = Dataset.query
+    # Pencarian lewat index full-text (diurutkan berdasarkan relevansi); tanpa pencarian, keyset menurut id dengan total dari tabel stats
     if search_query:
-        search_filter = f'%{search_query}%'
-        query = query.filter(or_(Dataset.text.ilike(search_filter), Dataset.username.ilike(search_filter)))
-    data_paginated = query.order_by(Dataset.id.asc()).paginate(page=page, per_page=per_page, error_out=False)
+        data_paginated = paginate_cached(apply_search(Dataset.query, Dataset, search_query), ('dataset', search_query), page, per_page, app.config.get('PAGINATION_COUNT_TTL', 60))
+    else:
+        data_paginated = paginate_by_id(Dataset.query, Dataset.id, get_stats()['dataset_total'], page, per_page)
     return render_template('input_data.html', title="Input Data", upload_form=upload_form, filter_form=filter_form, delete_all_form=delete_all_form, data=data_paginated, total_data=data_paginated.total, search_query=search_query, current_per_page=per_page)
 
 @app.route('/delete_all_data', methods=['POST'])
@@ -137,7 +142,9 @@ def delete_all_data():
             clear_results_session()
             Dataset.query.delete()
             Preprocessing.query.delete()
+            reset_stats(dataset=True, preprocessing=True)
             db.session.commit()
+            invalidate_model(app)
             flash('Semua data berhasil dihapus dari semua tabel.', 'success')
         except Exception as e:
             db.session.rollback()
@@ -148,20 +155,22 @@ def delete_all_data():
 def preprocessing():
     if request.method == 'POST':
         clear_results_session()
-        processed_count = run_preprocessing_in_batches(app)
-        flash(f'Preprocessing selesai. {processed_count} data berhasil diproses dan disimpan.', 'success')
-        return redirect(url_for('preprocessing'))
+        # Dijalankan di background; halaman job memantau progres lalu kembali ke halaman ini
+        job_id = submit_job(app, 'preprocessing', {'mode': request.form.get('mode', 'full'), 'resume': request.form.get('resume') == '1'})
+        return redirect(url_for('job_page', job_id=job_id))
     
     filter_form, delete_form = FilterDataForm(request.args, meta={'csrf': False}), DeletePreprocessingDataForm()
     page, per_page, search_query = request.args.get('page', 1, type=int), request.args.get('per_page', 10, type=int), request.args.get('search', '')
     filter_form.per_page.data, filter_form.search.data = per_page, search_query
-    total_data_mentah = db.session.query(func.count(Dataset.id)).scalar()
-    query = Preprocessing.query
+    total_data_mentah = get_stats()['dataset_total']
+    # Tombol lanjutkan hanya muncul jika preprocessing sebelumnya berhenti sebelum data mentah terakhir
+    status = preprocessing_status(app.config.get('PREPROCESSING_STATUS_TTL', 60), app.config.get('JOB_STALE_SECONDS', 120))
+    resume_available, pending_count = status['resume_available'], status['pending']
     if search_query:
-        search_filter = f'%{search_query}%'
-        query = query.filter(or_(Preprocessing.username.ilike(search_filter), Preprocessing.text_stem.ilike(search_filter)))
-    data_paginated = query.order_by(Preprocessing.id.asc()).paginate(page=page, per_page=per_page, error_out=False)
-    return render_template('preprocessing.html', title="Preprocessing Data", data=data_paginated, total_data_mentah=total_data_mentah, search_query=search_query, current_per_page=per_page, filter_form=filter_form, delete_form=delete_form)
+        data_paginated = paginate_cached(apply_search(Preprocessing.query, Preprocessing, search_query), ('preprocessing', search_query), page, per_page, app.config.get('PAGINATION_COUNT_TTL', 60))
+    else:
+        data_paginated = paginate_by_id(Preprocessing.query, Preprocessing.id, get_stats()['preprocessing_total'], page, per_page)
+    return render_template('preprocessing.html', title="Preprocessing Data", data=data_paginated, total_data_mentah=total_data_mentah, resume_available=resume_available, pending_count=pending_count, search_query=search_query, current_per_page=per_page, filter_form=filter_form, delete_form=delete_form)
 
 @app.route('/preprocessing/delete', methods=['POST'])
 def delete_preprocessing_data():
@@ -171,10 +180,15 @@ def delete_preprocessing_data():
             # Hapus juga hasil klasifikasi yang tersimpan karena sudah tidak relevan
             clear_results_session()
             num_rows_deleted = Preprocessing.query.delete()
+            reset_stats(preprocessing=True)
+            # Semua data mentah harus diproses ulang pada preprocessing inkremental berikutnya
+            Dataset.query.update({Dataset.preprocessed_hash: None, Dataset.preprocessed_version: None}, synchronize_session=False)
             # Commit untuk mereset auto-increment jika perlu
             if db.engine.name == 'mysql':
                 db.session.execute(text("ALTER TABLE preprocessing AUTO_INCREMENT = 1"))
             db.session.commit()
+            invalidate_model(app)
+            invalidate_preprocessing_status()
             flash(f'Semua {num_rows_deleted} data dari tabel Preprocessing berhasil dihapus.', 'success')
         except Exception as e:
             db.session.rollback()
@@ -188,17 +202,12 @@ def delete_preprocessing_data():
 def pelabelan():
     filter_form, labeling_form, delete_form, labeling_file_form = FilterDataForm(request.args, meta={'csrf': False}), LabelingForm(), DeleteAllDataForm(), LabelingFromFileForm()
     page, per_page, search_query = request.args.get('page', 1, type=int), request.args.get('per_page', 10, type=int), request.args.get('search', '')
-    query = Preprocessing.query
+    stats = get_stats()
     if search_query:
-        search_filter = f'%{search_query}%'
-        query = query.filter(or_(Preprocessing.username.ilike(search_filter), Preprocessing.text_stem.ilike(search_filter)))
-    data_paginated = query.order_by(Preprocessing.id.asc()).paginate(page=page, per_page=per_page, error_out=False)
-    counts = {
-        'total': db.session.query(func.count(Preprocessing.id)).scalar(),
-        'positif': db.session.query(func.count(Preprocessing.id)).filter_by(label='positif').scalar(),
-        'negatif': db.session.query(func.count(Preprocessing.id)).filter_by(label='negatif').scalar(),
-        'netral': db.session.query(func.count(Preprocessing.id)).filter_by(label='netral').scalar()
-    }
+        data_paginated = paginate_cached(apply_search(Preprocessing.query, Preprocessing, search_query), ('preprocessing', search_query), page, per_page, app.config.get('PAGINATION_COUNT_TTL', 60))
+    else:
+        data_paginated = paginate_by_id(Preprocessing.query, Preprocessing.id, stats['preprocessing_total'], page, per_page)
+    counts = {'total': stats['preprocessing_total'], 'positif': stats['positif'], 'negatif': stats['negatif'], 'netral': stats['netral']}
     return render_template('pelabelan.html', title="Pelabelan Manual", data=data_paginated, counts=counts, search_query=search_query, current_per_page=per_page, filter_form=filter_form, labeling_form=labeling_form, delete_form=delete_form, labeling_file_form=labeling_file_form)
 
 @app.route('/pelabelan/edit/<int:id>', methods=['POST'])
@@ -208,14 +217,17 @@ def edit_label(id):
         clear_results_session()
         data_to_update = Preprocessing.query.get_or_404(id)
         new_label = form.label.data or None
+        adjust_stats(labels=label_change(data_to_update.label, new_label))
         data_to_update.label = new_label
         try:
             db.session.commit()
+            if new_label: update_model(app, upserts={id: (data_to_update.text_stem, new_label)})
+            else: update_model(app, removals=[id])
             flash(f'Label untuk data ID {id} berhasil diperbarui.', 'success')
         except Exception as e:
             db.session.rollback()
             flash(f'Gagal memperbarui label: {str(e)}', 'danger')
-    return redirect(url_for('pelabelan', page=request.args.get('page', 1, type=int)))
+    return redirect(url_for('pelabelan', **list_args_from_request()))
 
 # ==========================================================
 # FUNGSI INI HARUS ADA DI FILE WEB.PY ANDA
@@ -228,13 +240,15 @@ def hapus_label(id):
         clear_results_session()
         data_to_update = Preprocessing.query.get_or_404(id)
         try:
+            adjust_stats(labels=label_change(data_to_update.label, None))
             data_to_update.label = None
             db.session.commit()
+            update_model(app, removals=[id])
             flash(f'Label untuk data dengan ID {id} berhasil dihapus.', 'success')
         except Exception as e:
             db.session.rollback()
             flash(f'Gagal menghapus label: {str(e)}', 'danger')
-    return redirect(url_for('pelabelan', page=request.args.get('page', 1, type=int)))
+    return redirect(url_for('pelabelan', **list_args_from_request()))
 # ==========================================================
 
 @app.route('/pelabelan/apply-from-file', methods=['POST'])
@@ -251,50 +265,17 @@ def apply_labels_from_file():
         file.save(filepath)
         
         try:
-            file_extension = filename.rsplit('.', 1)[1].lower()
-            df = pd.read_excel(filepath).fillna('') if file_extension in ['xls', 'xlsx'] else pd.read_csv(filepath, encoding='utf-8').fillna('')
-            
-            df.columns = [col.lower().strip() for col in df.columns]
-
-            if not {'text', 'sentimen'}.issubset(df.columns):
-                flash('File label harus memiliki kolom "text" dan "sentimen".', 'error')
+            # Label diterapkan di database: file dimuat ke tabel staging lalu satu UPDATE join
+            try:
+                summary = apply_labels(filepath, chunk_size=app.config.get('UPLOAD_CHUNK_SIZE', 10000))
+            except ValueError as e:
+                flash(str(e), 'error')
                 return redirect(url_for('pelabelan'))
-
-            # LOGIKA UTAMA: Melabeli tabel PREPROCESSING
-            
-            # 1. Buat peta pencarian dari tabel PREPROCESSING
-            preprocessing_map = {}
-            for p_object in Preprocessing.query.all():
-                cleaned_original_text = clean_text(p_object.text)
-                if cleaned_original_text not in preprocessing_map:
-                    preprocessing_map[cleaned_original_text] = []
-                preprocessing_map[cleaned_original_text].append(p_object)
-            
-            updated_ids = set()
-            not_found_count = 0
-
-            # 2. Iterasi melalui file Excel untuk melabeli data
-            for _, row in df.iterrows():
-                original_text_from_file = clean_text(row['text'])
-                label_value = str(row['sentimen']).strip().lower()
-
-                list_of_data_to_update = preprocessing_map.get(original_text_from_file)
-                
-                if list_of_data_to_update:
-                    # 3. Jika ditemukan, labeli SEMUA data yang cocok (termasuk duplikat)
-                    for data_to_update in list_of_data_to_update:
-                        if label_value in ['positif', 'negatif', 'netral']:
-                            data_to_update.label = label_value
-                            updated_ids.add(data_to_update.id)
-                else:
-                    not_found_count += 1
-            
-            final_updated_count = len(updated_ids)
-            db.session.commit()
+            invalidate_model(app)
             
-            flash(f'Pelabelan selesai. {final_updated_count} baris data unik berhasil diperbarui.', 'success')
-            if not_found_count > 0:
-                flash(f'Info: {not_found_count} baris dari file label tidak ditemukan di data preprocessing dan diabaikan.', 'info')
+            flash(f'Pelabelan selesai. {summary["matched"]} baris data unik berhasil diperbarui.', 'success')
+            if summary['unmatched'] > 0:
+                flash(f'Info: {summary["unmatched"]} baris dari file label tidak ditemukan di data preprocessing dan diabaikan.', 'info')
 
         except Exception as e:
             db.session.rollback()
@@ -313,7 +294,7 @@ def klasifikasi():
     form = ClassificationForm()
     predict_form = PredictForm()
     
-    labeled_data_count = Preprocessing.query.filter(Preprocessing.label.isnot(None)).count()
+    labeled_data_count = get_stats()['labeled_total']
     
     detailed_results = session.get('detailed_results', None)
     experiment_results = session.get('experiment_results', None)
@@ -333,23 +314,12 @@ def klasifikasi():
     if form.is_submitted() and (form.submit_classify.data or form.submit_experiment.data):
         if form.submit_experiment.data:
             clear_results_session()
-            labeled_data = Preprocessing.query.filter(Preprocessing.label.isnot(None)).all()
-            if len(labeled_data) < 20:
+            if labeled_data_count < 20:
                 flash('Tidak cukup data berlabel untuk validasi.', 'warning')
                 return redirect(url_for('klasifikasi'))
-            X_all, y_all = [data.text_stem for data in labeled_data], [data.label for data in labeled_data]
-            k_options, N_FOLDS = [7, 9, 11, 13, 15, 17], 5
-            
             # --- PASTIKAN random_state DIKIRIM KE FUNGSI ---
-            summary_list = run_kfold_cross_validation(X_all, y_all, k_options, n_folds=N_FOLDS, random_state=RANDOM_STATE_SEED)
-            
-            if summary_list:
-                session['experiment_results'] = summary_list
-                best_result = max(summary_list, key=lambda item: item['avg_accuracy'])
-                best_k_found = best_result['k']
-                session['last_k_value'] = best_k_found
-                flash(f'Validasi K-Fold selesai! K terbaik ditemukan: {best_k_found}.', 'success')
-                return redirect(url_for('klasifikasi', best_k=best_k_found))
+            job_id = submit_job(app, 'kfold', {'k_options': [7, 9, 11, 13, 15, 17], 'n_folds': 5, 'random_state': RANDOM_STATE_SEED})
+            return redirect(url_for('job_page', job_id=job_id))
 
         elif form.submit_classify.data:
             # ... (sisa logika klasifikasi tunggal tidak berubah, karena sudah menggunakan RANDOM_STATE_SEED)
@@ -357,19 +327,9 @@ def klasifikasi():
             clear_results_session()
             k = form.k_value.data
             session['last_k_value'] = k
-            labeled_data = Preprocessing.query.filter(Preprocessing.label.isnot(None)).all()
-            if len(labeled_data) < 20: flash('Tidak cukup data berlabel.', 'warning'); return redirect(url_for('klasifikasi'))
-            X_all, y_all = [data.text_stem for data in labeled_data], [data.label for data in labeled_data]
-            test_size = form.test_size.data
-            X_train, X_test, y_train, y_test = train_test_split(X_all, y_all, test_size=test_size/100.0, random_state=RANDOM_STATE_SEED)
-            vectorizer = TFIDFVectorizer().fit(X_train)
-            X_train_vec, X_test_vec = vectorizer.transform(X_train), vectorizer.transform(X_test)
-            model = KNeighborsClassifier(k=k).fit(X_train_vec, y_train)
-            y_pred = model.predict(X_test_vec)
-            metrics = calculate_metrics(y_test, y_pred)
-            session['detailed_results'] = {'model_name': f"KNN (K={k})",'k': k, 'test_size': test_size, 'metrics': metrics,'predictions': [{'text': X_test[i], 'actual': y_test[i], 'predicted': y_pred[i]} for i in range(len(y_test))], 'prediction_counts': {'total': len(y_test), 'positif': y_pred.count('positif'), 'negatif': y_pred.count('negatif'), 'netral': y_pred.count('netral')}}
-            flash(f'Klasifikasi tunggal dengan KNN (K={k}) berhasil.', 'info')
-            return redirect(url_for('klasifikasi', best_k=k))
+            if labeled_data_count < 20: flash('Tidak cukup data berlabel.', 'warning'); return redirect(url_for('klasifikasi'))
+            job_id = submit_job(app, 'classify', {'k': k, 'test_size': form.test_size.data, 'random_state': RANDOM_STATE_SEED})
+            return redirect(url_for('job_page', job_id=job_id))
 
     # Menangani form prediksi tunggal
     if predict_form.is_submitted() and predict_form.submit_predict.data:
@@ -385,21 +345,125 @@ def klasifikasi():
             return redirect(url_for('klasifikasi'))
         
         text_input = predict_form.text_to_predict.data
-        preprocessed_text = full_preprocess_text(text_input)['stemmed']
-        all_labeled_data = Preprocessing.query.filter(Preprocessing.label.isnot(None)).all()
-        if len(all_labeled_data) < 10: flash('Tidak cukup data berlabel untuk prediksi.', 'warning')
+        preprocessed_text = full_preprocess_batch([text_input])[0]['stemmed']
+        # Model (vectorizer + index KNN) diambil dari registry; hanya dilatih ulang jika label berubah
+        model = get_model(app)
+        if model is None or model.n_samples < 10: flash('Tidak cukup data berlabel untuk prediksi.', 'warning')
         else:
-            X_full, y_full = [d.text_stem for d in all_labeled_data], [d.label for d in all_labeled_data]
-            vectorizer = TFIDFVectorizer().fit(X_full)
-            X_full_vec, X_predict_vec = vectorizer.transform(X_full), vectorizer.transform([preprocessed_text])
-            knn_model = KNeighborsClassifier(k=k_predict).fit(X_full_vec, y_full)
-            prediction = knn_model.predict(X_predict_vec)[0]
+            prediction = model.predict([preprocessed_text], k=k_predict)[0]
             session['single_prediction_result'] = {'text': text_input, 'processed_text': preprocessed_text, 'prediction': prediction}
             session['last_k_value'] = k_predict
         return redirect(url_for('klasifikasi', best_k=k_predict))
 
     return render_template('klasifikasi.html', title="Klasifikasi & Validasi KNN", form=form, predict_form=predict_form, total_labeled_data=labeled_data_count, detailed_results=detailed_results, experiment_results=experiment_results, single_prediction_result=single_prediction_result)
 
+# ===================================================================
+# JOB BACKGROUND: preprocessing, K-Fold, dan klasifikasi tunggal
+# Handler mengembalikan dict hasil: message/category untuk flash, session untuk nilai yang
+# disimpan ke session pengguna, dan redirect (endpoint + args) tujuan setelah selesai.
+# ===================================================================
+def _labeled_xy():
+    labeled_data = Preprocessing.query.filter(Preprocessing.label.isnot(None)).all()
+    return [data.text_stem for data in labeled_data], [data.label for data in labeled_data]
+
+@register_job('preprocessing')
+def preprocessing_job(app, params, report):
+    progress = lambda done, total: report(done, total, f'{done} dari {total} data diproses')
+    if params.get('mode') == 'incremental':
+        summary = run_incremental_preprocessing(app, progress=progress)
+        invalidate_model(app)
+        if summary['full_rebuild']:
+            return {'message': f'Hasil preprocessing lama belum terhubung ke data mentah, sehingga dijalankan preprocessing penuh. {summary["inserted"]} data berhasil diproses dan disimpan.', 'category': 'info', 'redirect': ['preprocessing', {}], 'summary': summary}
+        return {'message': f'Preprocessing inkremental selesai. {summary["processed"]} data diproses: {summary["inserted"]} baru, {summary["updated"]} diperbarui, {summary["deleted"]} dihapus, {summary["labels_reset"]} label direset, {summary["deduplicated"]} duplikat diambil dari cache.', 'category': 'success', 'redirect': ['preprocessing', {}], 'summary': summary}
+    resume = params.get('resume', False)
+    summary = run_preprocessing_in_batches(app, resume=resume, progress=progress)
+    invalidate_model(app)
+    return {'message': f'Preprocessing {"dilanjutkan" if resume else "selesai"}. {summary["inserted"]} data berhasil diproses dan disimpan ({summary["deduplicated"]} data duplikat diambil dari cache).', 'category': 'success', 'redirect': ['preprocessing', {}], 'summary': summary}
+
+@register_job('kfold')
+def kfold_job(app, params, report):
+    X_all, y_all = _labeled_xy()
+    summary_list = run_kfold_cross_validation(X_all, y_all, params['k_options'], n_folds=params['n_folds'], random_state=params['random_state'],
+                                              n_jobs=app.config.get('KFOLD_N_JOBS', 1), prediction_jobs=app.config.get('KNN_PREDICTION_JOBS', 1),
+                                              knn_options=knn_options_from_config(app.config),
+                                              progress=lambda done, total: report(done, total, f'Fold {done} dari {total} selesai'))
+    if not summary_list:
+        return {'message': 'Validasi K-Fold tidak menghasilkan ringkasan.', 'category': 'warning', 'redirect': ['klasifikasi', {}]}
+    best_k_found = max(summary_list, key=lambda item: item['avg_accuracy'])['k']
+    return {'message': f'Validasi K-Fold selesai! K terbaik ditemukan: {best_k_found}.', 'category': 'success',
+            'session': {'experiment_results': summary_list, 'last_k_value': best_k_found}, 'redirect': ['klasifikasi', {'best_k': best_k_found}]}
+
+@register_job('classify')
+def classify_job(app, params, report):
+    k, test_size = params['k'], params['test_size']
+    X_all, y_all = _labeled_xy()
+    X_train, X_test, y_train, y_test = train_test_split(X_all, y_all, test_size=test_size/100.0, random_state=params['random_state'])
+    report(1, 3, 'Membangun TF-IDF...')
+    vectorizer = TFIDFVectorizer().fit(X_train)
+    X_train_vec, X_test_vec = vectorizer.transform(X_train, sparse=True), vectorizer.transform(X_test, sparse=True)
+    report(2, 3, 'Memprediksi data uji...')
+    model = KNeighborsClassifier(k=k, **knn_options_from_config(app.config)).fit(X_train_vec, y_train)
+    y_pred = model.predict(X_test_vec)
+    metrics = calculate_metrics(y_test, y_pred)
+    detailed_results = {'model_name': f"KNN (K={k})",'k': k, 'test_size': test_size, 'metrics': metrics,'predictions': [{'text': X_test[i], 'actual': y_test[i], 'predicted': y_pred[i]} for i in range(len(y_test))], 'prediction_counts': {'total': len(y_test), 'positif': y_pred.count('positif'), 'negatif': y_pred.count('negatif'), 'netral': y_pred.count('netral')}}
+    return {'message': f'Klasifikasi tunggal dengan KNN (K={k}) berhasil.', 'category': 'info',
+            'session': {'detailed_results': detailed_results, 'last_k_value': k}, 'redirect': ['klasifikasi', {'best_k': k}]}
+
+@app.route('/jobs/<job_id>')
+def job_page(job_id):
+    status = job_status(job_id)
+    if status is None: abort(404)
+    return render_template('job.html', title="Memproses...", job=status)
+
+@app.route('/jobs/<job_id>/status')
+def job_status_api(job_id):
+    status = job_status(job_id)
+    if status is None: return jsonify({'error': 'Job tidak ditemukan.'}), 404
+    status['result_url'] = url_for('job_result_view', job_id=job_id) if status['status'] == 'done' else None
+    return jsonify(status)
+
+@app.route('/jobs/<job_id>/result')
+def job_result_view(job_id):
+    """Menerapkan hasil job (flash + session) lalu kembali ke halaman asal. ?format=json untuk hasil mentah."""
+    status = job_status(job_id)
+    if status is None: abort(404)
+    if status['status'] == 'failed':
+        flash(f'Proses gagal: {status["error"]}', 'error')
+        return redirect(url_for('index'))
+    result = job_result(job_id)
+    if result is None: return redirect(url_for('job_page', job_id=job_id))
+    if request.args.get('format') == 'json': return jsonify(result)
+    for key, value in result.get('session', {}).items():
+        session[key] = value
+    flash(result['message'], result.get('category', 'info'))
+    endpoint, args = result.get('redirect', ['index', {}])
+    return redirect(url_for(endpoint, **args))
+
+@app.route('/metrics/preprocessing')
+def preprocessing_metrics():
+    """Waktu per langkah preprocessing (run terakhir di proses ini), statistik cache stem, dan waktu startup."""
+    report = profiler.report()
+    report['startup'] = dict(STARTUP_TIMINGS)
+    return jsonify(report)
+
+@app.route('/klasifikasi/ann-report')
+def ann_report():
+    """Membandingkan engine LSH (approximate) dengan engine exact pada split validasi."""
+    labeled_data = Preprocessing.query.filter(Preprocessing.label.isnot(None)).all()
+    if len(labeled_data) < 20:
+        flash('Tidak cukup data berlabel untuk membandingkan engine KNN.', 'warning')
+        return redirect(url_for('klasifikasi'))
+    X_all, y_all = [data.text_stem for data in labeled_data], [data.label for data in labeled_data]
+    k = request.args.get('k', session.get('last_k_value') or 7, type=int)
+    tables = request.args.get('tables', app.config.get('KNN_LSH_TABLES', 16), type=int)
+    bits = request.args.get('bits', app.config.get('KNN_LSH_BITS', 8), type=int)
+    report = ann_agreement_report(X_all, y_all, k=k, random_state=42, lsh_tables=tables, lsh_bits=bits)
+    flash(f"LSH ({report['lsh_tables']} tabel x {report['lsh_bits']} bit, K={report['k']}): prediksi sama dengan KNN exact "
+          f"pada {report['agreement'] * 100:.2f}% dari {report['n_test']} data uji, recall tetangga {report['recall'] * 100:.2f}%. "
+          f"Akurasi exact {report['exact_accuracy'] * 100:.2f}% vs LSH {report['ann_accuracy'] * 100:.2f}%; "
+          f"waktu {report['exact_seconds']:.3f} dtk vs {report['ann_seconds']:.3f} dtk.", 'info')
+    return redirect(url_for('klasifikasi'))
+
 @app.route('/klasifikasi/clear')
 def clear_classification_results():
     clear_results_session()
@@ -446,6 +510,21 @@ def visualisasi():
         return render_template('visualisasi.html', title="Visualisasi Hasil", error=True)
 
 
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Menghitung ulang tabel stats dari tabel dataset dan preprocessing."""
+    db.create_all()
+    values = rebuild_stats()
+    db.session.commit()
+    print("Stats dihitung ulang: " + ", ".join(f"{name}={value}" for name, value in values.items() if name != 'updated_at'))
+
+@app.cli.command('rebuild-search-index')
+def rebuild_search_index_command():
+    """Membuat (jika belum ada) dan membangun ulang index full-text pencarian data."""
+    db.create_all()
+    rebuild_search_index()
+    print("Index pencarian full-text " + ("siap." if search_available() else "tidak didukung database ini; pencarian memakai ILIKE."))
+
 @app.errorhandler(404)
 def not_found_error(error): return render_template('404.html', title="Halaman Tidak Ditemukan"), 404
 
@@ -455,6 +534,11 @@ def internal_error(error): db.session.rollback(); return render_template('500.ht
 if __name__ == '__main__':
     with app.app_context():
         if not os.path.exists(app.config.get('UPLOAD_FOLDER')): os.makedirs(app.config.get('UPLOAD_FOLDER'))
+        if not os.path.exists(app.config.get('MODEL_FOLDER')): os.makedirs(app.config.get('MODEL_FOLDER'))
         db.create_all()
+        upgrade_schema()
+        ensure_search_index()
+        recover_interrupted_jobs()
+    print("Waktu startup preprocessing: " + ", ".join(f"{name} {seconds:.3f} dtk" for name, seconds in STARTUP_TIMINGS.items()))
     debug_mode = app.config.get('DEBUG', False)
     app.run(debug=debug_mode)
\ No newline at end of file